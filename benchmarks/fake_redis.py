@@ -0,0 +1,160 @@
+"""Local stand-in for a Redis server, enough for the lease backend.
+
+Speaks RESP2 and implements only the commands leases.RedisLeaseBackend
+sends (PING, AUTH, SELECT, GET, SET NX/PX/EX, DEL, PEXPIRE, PTTL and EVAL
+of its two compare-and-set scripts). Lets the multi-host lease setup be
+exercised on one machine:
+
+    python benchmarks/fake_redis.py --port 6380
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class RedisState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+        self.expires = {}
+
+    def _alive(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def get(self, key):
+        return self.data[key] if self._alive(key) else None
+
+    def delete(self, key):
+        existed = self._alive(key)
+        self.data.pop(key, None)
+        self.expires.pop(key, None)
+        return int(existed)
+
+    def pexpire(self, key, ms):
+        if not self._alive(key):
+            return 0
+        self.expires[key] = time.monotonic() + int(ms) / 1000
+        return 1
+
+    def set(self, key, value, options):
+        options = [o.upper() for o in options]
+        if "NX" in options and self._alive(key):
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        for unit, scale in (("PX", 1), ("EX", 1000)):
+            if unit in options:
+                self.pexpire(key, int(options[options.index(unit) + 1]) * scale)
+        return "OK"
+
+    def eval(self, script, keys, args):
+        # No Lua here: recognise the lease backend's "if GET == owner then
+        # PEXPIRE/DEL" scripts by the command they end in.
+        if self.get(keys[0]) != args[0]:
+            return 0
+        if "'pexpire'" in script:
+            return self.pexpire(keys[0], args[1])
+        if "'del'" in script:
+            return self.delete(keys[0])
+        raise ValueError("ERR fake server only runs the lease scripts")
+
+    def execute(self, args):
+        name, args = args[0].upper(), args[1:]
+        with self.lock:
+            if name == "PING":
+                return "PONG"
+            if name in ("AUTH", "SELECT"):
+                return "OK"
+            if name == "GET":
+                return self.get(args[0])
+            if name == "SET":
+                return self.set(args[0], args[1], args[2:])
+            if name == "DEL":
+                return sum(self.delete(k) for k in args)
+            if name == "PEXPIRE":
+                return self.pexpire(args[0], args[1])
+            if name == "PTTL":
+                if not self._alive(args[0]):
+                    return -2
+                deadline = self.expires.get(args[0])
+                return -1 if deadline is None else int((deadline - time.monotonic()) * 1000)
+            if name == "EVAL":
+                count = int(args[1])
+                return self.eval(args[0], args[2 : 2 + count], args[2 + count :])
+        raise ValueError(f"ERR unknown command '{name}'")
+
+
+def encode(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if value in ("OK", "PONG"):
+        return f"+{value}\r\n".encode()
+    data = value.encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command, as typed into telnet
+            return line.decode().split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            size = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(size + 2)[:-2].decode())
+        return args
+
+    def handle(self):
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            if not args:
+                continue
+            try:
+                reply = encode(self.server.state.execute(args))
+            except (ValueError, IndexError) as e:
+                reply = f"-{e}\r\n".encode()
+            self.wfile.write(reply)
+
+
+class Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_fake_redis(host="127.0.0.1", port=0):
+    """Start the fake server in a daemon thread; returns (server, redis_url)."""
+    server = Server((host, port), Handler)
+    server.state = RedisState()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"redis://{host}:{server.server_address[1]}/0"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+
+    server, url = start_fake_redis(args.host, args.port)
+    print(f"Fake Redis on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,530 @@
+"""Local stand-in for the cchobby.nl storefront and the order-history backend.
+
+Serves just enough of Magento for login(), place_order() and the tracking
+sync to run end to end without touching the real shop:
+
+    python benchmarks/fake_storefront.py --port 8765 --latency 0.05
+"""
+
+import argparse
+import html
+import itertools
+import json
+import random
+import threading
+import time
+import urllib.parse
+import uuid
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+class StoreState:
+    def __init__(self, history_orders=30, lines_per_order=3, latency=0.0):
+        self.latency = latency
+        self.lines_per_order = lines_per_order
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.item_ids = itertools.count(1)
+        self.order_numbers = itertools.count(100000001)
+        self.orders = []
+        self.products = {}
+        self.backend_writes = []
+        for _ in range(history_orders):
+            self._add_order([])
+
+    def _add_order(self, items):
+        number = str(next(self.order_numbers))
+        self.orders.insert(
+            0,
+            {
+                "number": number,
+                "items": items,
+                "tracking": [f"TRK{number}", f"TRK{number}B"][: random.randint(1, 2)],
+            },
+        )
+        return number
+
+    def session(self, sid):
+        with self.lock:
+            if sid not in self.sessions:
+                self.sessions[sid] = {
+                    "logged_in": False,
+                    "form_key": uuid.uuid4().hex[:16],
+                    "cart": {},
+                }
+            return self.sessions[sid]
+
+    def place_order(self, sess):
+        with self.lock:
+            items = list(sess["cart"].values())
+            sess["cart"] = {}
+            return self._add_order(items)
+
+
+def product_id(sku):
+    return str(sum(ord(c) * 31 ** i for i, c in enumerate(sku)) % 900000 + 100000)
+
+
+# =====================================================
+# PAGES
+# =====================================================
+
+def page(title, body, script=""):
+    return f"""<!doctype html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title></head>
+<body>
+<header>
+  <form action="/catalogsearch/result/" method="get"><input name="q" type="text"></form>
+  <div class="minicart"><span class="counter-number">{{counter}}</span></div>
+</header>
+<main>{body}</main>
+<script>
+function formKey() {{
+  const m = document.cookie.match(/form_key=([^;]+)/);
+  return m ? m[1] : '';
+}}
+{script}
+</script>
+</body></html>"""
+
+
+LOGIN_BODY = """
+<div class="coi-banner"><button class="coi-banner__accept"
+  onclick="this.parentNode.remove()">OK</button></div>
+<form method="post" action="/customer/account/loginPost/">
+  <input id="email" name="login[username]" type="email">
+  <input id="pass" name="login[password]" type="password">
+  <button id="send2" type="submit" class="action login primary">Inloggen</button>
+</form>
+"""
+
+SEARCH_ITEM = """
+<li class="product-item">
+  <a class="product-item-link" href="/p/{sku}.html">{sku}</a>
+  <form data-role="tocart-form" method="post" action="/checkout/cart/add/product/{pid}/">
+    <input type="hidden" name="product" value="{pid}">
+    <input name="qty" value="1">
+    <button type="button" class="qty-change increase"
+      onclick="const q=this.form.qty; q.value=parseInt(q.value)+1;">+</button>
+    <button type="submit" class="action tocart">In winkelwagen</button>
+  </form>
+</li>
+"""
+
+SEARCH_SCRIPT = """
+document.querySelectorAll('form[data-role=tocart-form]').forEach(f => {
+  f.addEventListener('submit', ev => {
+    ev.preventDefault();
+    const data = new FormData(f);
+    data.append('form_key', formKey());
+    fetch(f.action, {method: 'POST', body: new URLSearchParams(data),
+                     headers: {'X-Requested-With': 'XMLHttpRequest'}})
+      .then(r => r.json())
+      .then(j => { document.querySelector('.counter-number').innerText = j.summary_count; });
+  });
+});
+"""
+
+CART_SCRIPT = """
+let pending = null;
+document.querySelectorAll('a.action-delete').forEach(a => a.addEventListener('click', ev => {
+  ev.preventDefault();
+  pending = a.dataset.item;
+  document.getElementById('confirm').style.display = 'block';
+}));
+function accept() {
+  fetch('/checkout/sidebar/removeItem/', {method: 'POST',
+    body: new URLSearchParams({item_id: pending, form_key: formKey()}),
+    headers: {'X-Requested-With': 'XMLHttpRequest'}})
+    .then(() => location.reload());
+}
+"""
+
+CHECKOUT_BODY = """
+<div id="checkout-step-shipping">
+  <button type="button" onclick="document.getElementById('co-shipping-form').style.display='block'">+ Nieuw adres</button>
+  <div id="co-shipping-form" style="display:none">
+    <input name="firstname"><input name="lastname"><input name="company">
+    <input name="vat_id"><input name="street[0]"><input name="postcode">
+    <input name="city"><input name="telephone">
+    <select name="country_id"><option value="NL">NL</option><option value="BE">BE</option>
+      <option value="DE">DE</option></select>
+    <button type="button" class="action-save-address" onclick="saveAddress()">Hier naartoe verzenden</button>
+  </div>
+  <table class="table-checkout-shipping-method"><tbody>
+    <tr class="row" data-title="DPD Nederlandse Zakelijke levering" onclick="pickShipping('dpd','nl')">
+      <td><input type="radio" name="ship"></td><td>DPD Nederlandse Zakelijke levering</td></tr>
+    <tr class="row" data-title="DPD Belgie Zakelijke levering" onclick="pickShipping('dpd','be_b2b')">
+      <td><input type="radio" name="ship"></td><td>DPD Belgie Zakelijke levering</td></tr>
+    <tr class="row" data-title="DPD Belgie Privé levering" onclick="pickShipping('dpd','be_b2c')">
+      <td><input type="radio" name="ship"></td><td>DPD Belgie Privé levering</td></tr>
+  </tbody></table>
+  <div id="shipping-method-buttons-container">
+    <button type="button" class="continue" onclick="toPayment()">Volgende</button>
+  </div>
+</div>
+<div id="checkout-step-payment" style="display:none">
+  <div id="checkout-payment-method-load">
+    <div class="payment-method"><input type="radio" name="payment" id="checkmo" value="checkmo"
+      onclick="pickPayment(this)"> Rembours</div>
+    <div class="payment-method"><input type="radio" name="payment" id="banktransfer" value="banktransfer"
+      onclick="pickPayment(this)"> Bankoverschrijving</div>
+  </div>
+  <label><input type="checkbox" name="billing-address-same-as-shipping" checked
+    onchange="document.getElementById('billing').style.display = this.checked ? 'none' : 'block'">
+    Zelfde als verzendadres</label>
+  <div id="billing" style="display:none">
+    <div class="billing-address-form">
+      <input name="firstname"><input name="lastname"><input name="company">
+      <input name="street[0]"><input name="postcode"><input name="city"><input name="telephone">
+      <select name="country_id"><option value="NL">NL</option><option value="BE">BE</option></select>
+    </div>
+    <div class="actions-toolbar"><button type="button" class="action-update" onclick="updateBilling()">Bijwerken</button></div>
+  </div>
+  <div class="billing-address-details"></div>
+  <div class="checkout-agreement"><input type="checkbox"></div>
+  <button type="button" class="action primary checkout" onclick="placeOrder()">Bestelling plaatsen</button>
+</div>
+"""
+
+CHECKOUT_SCRIPT = """
+function observable(value, onChange) {
+  return function(v) {
+    if (arguments.length) { value = v; if (onChange) onChange(v); }
+    return value;
+  };
+}
+const quote = {
+  shippingAddress: observable(null),
+  shippingMethod: observable(null),
+  paymentMethod: observable(null),
+  totals: observable(null),
+  billingAddress: observable(null, a => {
+    document.querySelector('.billing-address-details').innerText =
+      a ? [a.firstname, a.lastname, (a.street || []).join(' '), a.postcode, a.city].join(' ') : '';
+  }),
+};
+const modules = {
+  'Magento_Checkout/js/model/quote': quote,
+  'Magento_Customer/js/customer-data': {invalidate: function() {}},
+  'Magento_Checkout/js/model/cart/totals-processor/default': {
+    estimateTotals: () => setTimeout(() => quote.totals({grand_total: 42}), 50)
+  },
+  'Magento_Checkout/js/model/payment-service': {
+    getAvailablePaymentMethods: () => [{method: 'checkmo'}, {method: 'banktransfer'}]
+  },
+  'Magento_Checkout/js/action/select-payment-method': m => quote.paymentMethod(m),
+};
+window.require = function(name) {
+  if (!(name in modules)) { throw new Error('Unknown module ' + name); }
+  return modules[name];
+};
+function field(root, name) { return root.querySelector('[name="' + name + '"]').value; }
+function saveAddress() {
+  const f = document.getElementById('co-shipping-form');
+  quote.shippingAddress({city: field(f, 'city'), country_id: field(f, 'country_id')});
+  f.style.display = 'none';
+}
+function pickShipping(carrier, method) {
+  quote.shippingMethod({carrier_code: carrier, method_code: method});
+}
+function toPayment() {
+  document.getElementById('checkout-step-shipping').style.display = 'none';
+  document.getElementById('checkout-step-payment').style.display = 'block';
+}
+function pickPayment(radio) {
+  document.querySelectorAll('.payment-method').forEach(p => p.classList.remove('_active'));
+  radio.parentNode.classList.add('_active');
+  quote.paymentMethod({method: radio.value});
+}
+function updateBilling() {
+  const f = document.querySelector('.billing-address-form');
+  quote.billingAddress({
+    firstname: field(f, 'firstname'), lastname: field(f, 'lastname'),
+    street: [field(f, 'street[0]')], postcode: field(f, 'postcode'), city: field(f, 'city')
+  });
+}
+function placeOrder() {
+  fetch('/checkout/placeOrder/', {method: 'POST',
+    body: new URLSearchParams({form_key: formKey()})})
+    .then(r => r.json())
+    .then(j => { location.href = '/checkout/onepage/success/?order=' + j.order; });
+}
+"""
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "FakeMagento/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    # -------------------------------------------------
+    # plumbing
+    # -------------------------------------------------
+
+    def _session(self):
+        cookies = SimpleCookie(self.headers.get("Cookie", ""))
+        sid = cookies["PHPSESSID"].value if "PHPSESSID" in cookies else None
+        self._new_sid = sid is None
+        self._sid = sid or uuid.uuid4().hex
+        return self.state.session(self._sid)
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        sess = self.state.session(self._sid)
+        if self._new_sid:
+            self.send_header("Set-Cookie", f"PHPSESSID={self._sid}; Path=/; HttpOnly")
+        self.send_header("Set-Cookie", f"form_key={sess['form_key']}; Path=/")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, payload, status=200):
+        self._send(status, json.dumps(payload), "application/json")
+
+    def _html(self, sess, title, body, script=""):
+        count = sum(i["qty"] for i in sess["cart"].values())
+        self._send(200, page(title, body, script).replace("{counter}", str(count)))
+
+    def _redirect(self, location):
+        self._send(302, "", headers={"Location": location})
+
+    def _form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length).decode("utf-8") if length else ""
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            return json.loads(raw or "{}")
+        return {k: v[0] for k, v in urllib.parse.parse_qs(raw).items()}
+
+    def _cart_section(self, sess):
+        return {
+            "summary_count": sum(i["qty"] for i in sess["cart"].values()),
+            "items": [
+                {"item_id": iid, "product_sku": i["sku"], "qty": i["qty"]}
+                for iid, i in sess["cart"].items()
+            ],
+        }
+
+    # -------------------------------------------------
+    # routing
+    # -------------------------------------------------
+
+    def do_GET(self):
+        time.sleep(self.state.latency)
+        url = urllib.parse.urlparse(self.path)
+        query = {k: v[0] for k, v in urllib.parse.parse_qs(url.query).items()}
+        path = url.path
+        sess = self._session()
+
+        if path.startswith("/v1/"):
+            return self._backend_get(path)
+        if path == "/robots.txt":
+            return self._send(200, "User-agent: *\n", "text/plain")
+        if path == "/customer/account/login/":
+            return self._html(sess, "Login", LOGIN_BODY)
+        if path == "/customer/section/load/":
+            sections = query.get("sections", "").split(",")
+            out = {}
+            if "customer" in sections:
+                out["customer"] = {"firstname": "Bench"} if sess["logged_in"] else {}
+            if "cart" in sections:
+                out["cart"] = self._cart_section(sess)
+            return self._json(out)
+
+        if not sess["logged_in"] and path != "/":
+            return self._redirect("/customer/account/login/")
+
+        if path in ("/", "/customer/account/"):
+            return self._html(sess, "Home", "<h1>CC Hobby (fake)</h1>")
+        if path == "/catalogsearch/result/":
+            sku = query.get("q", "").strip()
+            with self.state.lock:
+                self.state.products[product_id(sku)] = sku
+            body = "<ol class='products'>" + SEARCH_ITEM.format(
+                sku=html.escape(sku), pid=product_id(sku)
+            ) + "</ol>"
+            return self._html(sess, "Search", body, SEARCH_SCRIPT)
+        if path == "/checkout/cart/":
+            rows = "".join(
+                f"<tr><td>{html.escape(i['sku'])}</td><td>{i['qty']}</td>"
+                f"<td><a href='#' class='action action-delete' data-item='{iid}'>x</a></td></tr>"
+                for iid, i in sess["cart"].items()
+            )
+            body = (
+                f"<table id='shopping-cart-table' class='cart'><tbody>{rows}</tbody></table>"
+                "<div id='confirm' style='display:none'>"
+                "<button class='action-primary action-accept' onclick='accept()'>OK</button></div>"
+            )
+            return self._html(sess, "Cart", body, CART_SCRIPT)
+        if path == "/checkout/":
+            return self._html(sess, "Checkout", CHECKOUT_BODY, CHECKOUT_SCRIPT)
+        if path == "/checkout/onepage/success/":
+            body = (
+                "<div class='checkout-success-container'><div class='block thank-you-note'>"
+                f"Uw bestelnummer is: <span>{html.escape(query.get('order', ''))}</span></div></div>"
+            )
+            return self._html(sess, "Success", body)
+        if path == "/sales/order/history/":
+            return self._history(sess, query)
+        if path.startswith("/sales/order/view/order_id/"):
+            number = path.rstrip("/").split("/")[-1]
+            order = next((o for o in self.state.orders if o["number"] == number), None)
+            if not order:
+                return self._send(404, "Not found")
+            links = "".join(
+                f"<div class='track-button'><a href='https://tracking.example/track?id={t}'>{t}</a></div>"
+                for t in order["tracking"]
+            )
+            return self._html(sess, "Order", f"<div class='block track-order'>{links}</div>")
+        return self._send(404, "Not found")
+
+    def do_POST(self):
+        time.sleep(self.state.latency)
+        path = urllib.parse.urlparse(self.path).path
+        sess = self._session()
+        form = self._form()
+
+        if path.startswith("/v1/"):
+            return self._backend_post(path, form)
+        if path == "/customer/account/loginPost/":
+            if form.get("login[username]") == EMAIL and form.get("login[password]") == PASSWORD:
+                sess["logged_in"] = True
+                return self._redirect("/customer/account/")
+            return self._redirect("/customer/account/login/")
+
+        if not sess["logged_in"]:
+            return self._json({"error": "not logged in"}, 403)
+        if form.get("form_key") != sess["form_key"]:
+            return self._json({"error": "invalid form key"}, 400)
+
+        if path.startswith("/checkout/cart/add/"):
+            sku = self.state.products.get(form.get("product"), form.get("product"))
+            qty = int(form.get("qty") or 1)
+            with self.state.lock:
+                for item in sess["cart"].values():
+                    if item["sku"] == sku:
+                        item["qty"] += qty
+                        break
+                else:
+                    sess["cart"][str(next(self.state.item_ids))] = {"sku": sku, "qty": qty}
+            return self._json({"summary_count": self._cart_section(sess)["summary_count"]})
+        if path == "/checkout/sidebar/removeItem/":
+            with self.state.lock:
+                sess["cart"].pop(form.get("item_id"), None)
+            return self._json({"success": True})
+        if path == "/checkout/sidebar/updateItemQty/":
+            with self.state.lock:
+                item = sess["cart"].get(form.get("item_id"))
+                if item:
+                    item["qty"] = int(form.get("item_qty") or 1)
+            return self._json({"success": bool(item)})
+        if path == "/checkout/placeOrder/":
+            return self._json({"order": self.state.place_order(sess)})
+        return self._send(404, "Not found")
+
+    def _history(self, sess, query):
+        limit = int(query.get("limit") or 10)
+        page_no = int(query.get("p") or 1)
+        orders = self.state.orders[(page_no - 1) * limit : page_no * limit]
+        rows = "".join(
+            f"<tr><td class='col id'>{o['number']}</td><td class='col date'>1-1-2026</td>"
+            f"<td class='col total'>€ 10,00</td><td class='col status'>Verzonden</td>"
+            f"<td><a class='action view' href='/sales/order/view/order_id/{o['number']}/'>Bekijk</a></td></tr>"
+            for o in orders
+        )
+        pager = ""
+        if page_no * limit < len(self.state.orders):
+            pager = (
+                "<ul class='pages'><li class='pages-item-next'>"
+                f"<a href='/sales/order/history/?limit={limit}&p={page_no + 1}'>Volgende</a></li></ul>"
+            )
+        body = f"<table><tbody>{rows}</tbody></table>{pager}"
+        if not orders:
+            body = "<div class='message info empty'>Geen bestellingen</div>"
+        return self._html(sess, "History", body)
+
+    # -------------------------------------------------
+    # backend stub
+    # -------------------------------------------------
+
+    def _backend_get(self, path):
+        if path.startswith("/v1/order-history/internal/"):
+            order_id = path.rstrip("/").split("/")[-1]
+            skus = [f"BENCH-{order_id}-{i}" for i in range(self.state.lines_per_order)]
+            return self._json(
+                {
+                    "lightspeedRawOrder": {
+                        "firstname": "Jan",
+                        "lastname": "Bench",
+                        "companyName": "",
+                        "addressShippingStreet": "Teststraat",
+                        "addressShippingNumber": "1",
+                        "addressShippingZipcode": "1234 AB",
+                        "addressShippingCity": "Utrecht",
+                        "addressShippingCountry": {"code": "nl"},
+                        "phone": "0612345678",
+                    },
+                    "products": [
+                        {"product": {"articleNo": sku}, "quantity": i + 1}
+                        for i, sku in enumerate(skus)
+                    ],
+                }
+            )
+        if path == "/v1/order-history/open-supplier-orders":
+            return self._json([o["number"] for o in self.state.orders])
+        return self._json({"error": "not found"}, 404)
+
+    def _backend_post(self, path, body):
+        with self.state.lock:
+            self.state.backend_writes.append({"path": path, "body": body})
+        return self._json({"ok": True})
+
+
+def start_storefront(host="127.0.0.1", port=0, **state_kwargs):
+    """Start the fake storefront in a daemon thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.state = StoreState(**state_kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--history-orders", type=int, default=30)
+    parser.add_argument("--lines", type=int, default=3)
+    args = parser.parse_args()
+
+    server, base_url = start_storefront(
+        args.host,
+        args.port,
+        history_orders=args.history_orders,
+        lines_per_order=args.lines,
+        latency=args.latency,
+    )
+    print(f"Fake storefront on {base_url} (login {EMAIL} / {PASSWORD})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Measure login, order placement and tracking sync against the fake storefront.
+
+    python benchmarks/run_benchmark.py --scenario all --concurrency 4 --orders 8
+
+The browser is created by login() exactly as in production, so point it at
+a Selenium endpoint that can reach --host (for a Dockerised grid use
+--host 0.0.0.0 --public-host host.docker.internal).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+sys.path.insert(0, BENCH_DIR)
+
+from fake_redis import start_fake_redis
+from fake_storefront import EMAIL, PASSWORD, start_storefront
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return round(values[lo] + (values[hi] - values[lo]) * (k - lo), 3)
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "mean": round(statistics.mean(samples), 3) if samples else None,
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "max": round(max(samples), 3) if samples else None,
+    }
+
+
+def configure_env(base_url, workdir, redis_url=None):
+    """Point every module at the fake store before any of them is imported."""
+    if redis_url:
+        os.environ.update({"LEASE_BACKEND": "redis", "LEASE_REDIS_URL": redis_url})
+    os.environ.update(
+        {
+            "SUPPLIER_STORE_URL": base_url,
+            "SUPPLIER_LOGIN_URL": f"{base_url}/customer/account/login/",
+            "SUPPLIER_EMAIL": EMAIL,
+            "SUPPLIER_PASSWORD": PASSWORD,
+            "BACKEND_URL": base_url,
+            "COOKIE_STORE_BACKEND": "memory",
+            "SKU_CACHE_PATH": os.path.join(workdir, "sku.sqlite3"),
+            "ORDER_CACHE_PATH": os.path.join(workdir, "orders.sqlite3"),
+            "JOBS_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+            "CHECKPOINT_DB_PATH": os.path.join(workdir, "checkpoints.sqlite3"),
+            "BACKEND_OUTBOX_PATH": os.path.join(workdir, "outbox.sqlite3"),
+            "TIMELINE_DIR": os.path.join(workdir, "timelines"),
+            "ARTIFACT_DIR": os.path.join(workdir, "artifacts"),
+            "LEASE_DB_PATH": os.path.join(workdir, "leases.sqlite3"),
+        }
+    )
+    sys.path.insert(0, os.path.join(SRC_DIR, "orderSyncing"))
+    sys.path.insert(0, SRC_DIR)
+
+
+def bench_login(concurrency, iterations, cold):
+    from cookie_store import get_cookie_store
+    from login import login
+
+    def one(_):
+        if cold:
+            get_cookie_store().clear(EMAIL)
+        start = time.monotonic()
+        driver = login()
+        seconds = time.monotonic() - start
+        driver.quit()
+        return seconds
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(one, range(iterations)))
+    wall = time.monotonic() - start
+    return {
+        "latency": summarize(samples),
+        "throughput_per_min": round(iterations / wall * 60, 2),
+    }
+
+
+def bench_place(concurrency, orders):
+    from batch import place_orders_batch
+    from metrics import TIMELINE_DIR
+
+    order_ids = [f"bench-{int(time.time())}-{i}" for i in range(orders)]
+    start = time.monotonic()
+    results = place_orders_batch(order_ids, workers=concurrency)
+    wall = time.monotonic() - start
+
+    stages, waits = {}, {}
+    resources = {"loadedRequests": 0, "loadedBytes": 0, "blockedRequests": 0}
+    for name in os.listdir(TIMELINE_DIR):
+        with open(os.path.join(TIMELINE_DIR, name), "r", encoding="utf-8") as f:
+            timeline = json.load(f)
+        for event in timeline["events"]:
+            target = stages if event["type"] == "stage" else waits
+            target.setdefault(event["name"], []).append(event["seconds"])
+        for key in resources:
+            resources[key] += timeline.get("resources", {}).get(key, 0)
+
+    ok = sum(1 for r in results if r["success"])
+    return {
+        "orders": len(results),
+        "succeeded": ok,
+        "latency": summarize([r["seconds"] for r in results]),
+        "throughput_per_min": round(ok / wall * 60, 2),
+        "stages": {k: summarize(v) for k, v in sorted(stages.items())},
+        "waits": {k: summarize(v) for k, v in sorted(waits.items())},
+        "resources": resources,
+    }
+
+
+def bench_leases(concurrency, iterations):
+    """Lease round trips and a mutual-exclusion check on one shared cart key."""
+    from leases import get_lease_manager
+
+    manager = get_lease_manager()
+    holders = []
+    overlaps = []
+    guard = threading.Lock()
+
+    def one(i):
+        start = time.monotonic()
+        with manager.hold("bench:cart", timeout=60):
+            acquired = time.monotonic() - start
+            with guard:
+                holders.append(i)
+                if len(holders) > 1:
+                    overlaps.append(list(holders))
+            time.sleep(0.001)
+            with guard:
+                holders.remove(i)
+        return acquired
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        waits = list(executor.map(one, range(iterations)))
+    wall = time.monotonic() - start
+
+    claims = [manager.claim(f"bench:submit:{i % 4}") for i in range(8)]
+    return {
+        "backend": type(manager.backend).__name__,
+        "leases": iterations,
+        "acquire": summarize(waits),
+        "per_second": round(iterations / wall, 2),
+        "overlaps": len(overlaps),
+        "claims_won": sum(claims),
+    }
+
+
+def bench_tracking(store, mode):
+    from batch_sync import sync_tracking_batch, sync_tracking_batch_http
+    from login import login
+
+    numbers = [o["number"] for o in store.orders]
+    if mode == "http":
+        # Seed the cookie store with one browser login, as production does
+        login().quit()
+        start = time.monotonic()
+        results = list(sync_tracking_batch_http(numbers))
+        wall = time.monotonic() - start
+    else:
+        driver = login()
+        try:
+            start = time.monotonic()
+            results = list(sync_tracking_batch(driver, numbers))
+            wall = time.monotonic() - start
+        finally:
+            driver.quit()
+    return {
+        "mode": mode,
+        "orders": len(results),
+        "tracked": sum(1 for r in results if r.get("trackingGenerated")),
+        "seconds": round(wall, 3),
+        "throughput_per_min": round(len(results) / wall * 60, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=("login", "place", "tracking", "leases", "all"), default="all")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--orders", type=int, default=4)
+    parser.add_argument("--logins", type=int, default=4)
+    parser.add_argument("--leases", type=int, default=100, help="Lease round trips")
+    parser.add_argument("--cold-login", action="store_true", help="Drop saved cookies before every login")
+    parser.add_argument("--lines", type=int, default=3, help="Order lines per order")
+    parser.add_argument("--history-orders", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--public-host", default=None, help="Host name the browser uses")
+    parser.add_argument("--tracking-mode", choices=("browser", "http", "both"), default="both")
+    parser.add_argument("--lease-backend", choices=("sqlite", "redis"), default="sqlite",
+                        help="redis runs a local fake Redis server")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    server, base_url = start_storefront(
+        args.host,
+        0,
+        history_orders=args.history_orders,
+        lines_per_order=args.lines,
+        latency=args.latency,
+    )
+    if args.public_host:
+        base_url = f"http://{args.public_host}:{server.server_address[1]}"
+    redis_server = redis_url = None
+    if args.lease_backend == "redis":
+        redis_server, redis_url = start_fake_redis(args.host, 0)
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    configure_env(base_url, workdir, redis_url)
+    print(f"Fake storefront on {base_url}, work dir {workdir}")
+
+    report = {"config": vars(args)}
+    if args.scenario in ("login", "all"):
+        report["login"] = bench_login(args.concurrency, args.logins, args.cold_login)
+    if args.scenario in ("place", "all"):
+        report["place"] = bench_place(args.concurrency, args.orders)
+    if args.scenario in ("tracking", "all"):
+        modes = ("browser", "http") if args.tracking_mode == "both" else (args.tracking_mode,)
+        for mode in modes:
+            key = "tracking" if mode == "browser" else f"tracking_{mode}"
+            report[key] = bench_tracking(server.state, mode)
+    if args.scenario in ("leases", "all"):
+        report["leases"] = bench_leases(args.concurrency, args.leases)
+    server.shutdown()
+    if redis_server:
+        redis_server.shutdown()
+
+    text = json.dumps(report, indent=2)
+    print("BENCHMARK_REPORT:" + text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
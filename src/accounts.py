@@ -0,0 +1,136 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from cart_lock import cart_lock
+from checkout_state import get_checkpoint_store
+from leases import LEASE_POLL_SECONDS
+from login import login
+from session_pool import POOL_SIZE, SessionPool
+
+# "email:password,email2:password2", or a JSON file with a list of
+# {"email": ..., "password": ...}. Falls back to SUPPLIER_EMAIL/PASSWORD.
+SUPPLIER_ACCOUNTS = os.getenv("SUPPLIER_ACCOUNTS", "")
+SUPPLIER_ACCOUNTS_FILE = os.getenv("SUPPLIER_ACCOUNTS_FILE", "")
+ACCOUNT_POOL_SIZE = int(os.getenv("ACCOUNT_POOL_SIZE", str(POOL_SIZE)))
+
+
+def load_accounts():
+    if SUPPLIER_ACCOUNTS_FILE:
+        with open(SUPPLIER_ACCOUNTS_FILE, "r", encoding="utf-8") as f:
+            accounts = json.load(f)
+    elif SUPPLIER_ACCOUNTS:
+        accounts = []
+        for entry in SUPPLIER_ACCOUNTS.split(","):
+            email, _, password = entry.strip().partition(":")
+            accounts.append({"email": email, "password": password})
+    else:
+        accounts = [
+            {
+                "email": os.getenv("SUPPLIER_EMAIL", ""),
+                "password": os.getenv("SUPPLIER_PASSWORD", ""),
+            }
+        ]
+    accounts = [a for a in accounts if a.get("email") and a.get("password")]
+    if not accounts:
+        raise Exception("No supplier accounts configured")
+    return accounts
+
+
+class AccountScheduler:
+    """Shards orders over supplier accounts, one checkout per account at a time.
+
+    Every account has its own session pool and cart lock. lease() hands out
+    a free account, preferring the one whose cart holds the order's
+    checkpointed progress, skips accounts whose cart lease is held by
+    another process or host, and waits while every account is busy.
+    """
+
+    def __init__(self, accounts=None, pool_size=ACCOUNT_POOL_SIZE):
+        self.accounts = accounts or load_accounts()
+        self.pools = {
+            a["email"]: SessionPool(
+                size=pool_size, factory=functools.partial(login, a["email"], a["password"])
+            )
+            for a in self.accounts
+        }
+        self._cond = threading.Condition()
+        self._busy = set()
+        self._last_lease = {a["email"]: 0.0 for a in self.accounts}
+
+    @property
+    def size(self):
+        return len(self.accounts)
+
+    def in_order(self, preferred=None):
+        """All accounts, `preferred` (an email) first."""
+        return sorted(self.accounts, key=lambda a: a["email"] != preferred)
+
+    def _pick(self, preferred, skip=()):
+        free = [a for a in self.accounts if a["email"] not in self._busy and a["email"] not in skip]
+        if not free:
+            return None
+        for account in free:
+            if account["email"] == preferred:
+                return account
+        # Least recently leased first spreads orders evenly
+        return min(free, key=lambda a: self._last_lease[a["email"]])
+
+    @contextmanager
+    def lease(self, order_id=None, timeout=None):
+        """Yield (account, session pool) with the account's cart lock held."""
+        preferred = get_checkpoint_store().account(order_id) if order_id else None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # Accounts whose cart another process or host is using right now
+        elsewhere = set()
+        while True:
+            with self._cond:
+                account = self._pick(preferred, elsewhere)
+                if account is None:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"No supplier account free within {timeout}s")
+                    # Other nodes release without notifying us, so poll
+                    wait = LEASE_POLL_SECONDS if elsewhere else remaining
+                    if remaining is not None and wait is not None:
+                        wait = min(wait, remaining)
+                    self._cond.wait(timeout=wait)
+                    elsewhere.clear()
+                    continue
+                email = account["email"]
+                self._busy.add(email)
+            lock = cart_lock(email)
+            try:
+                acquired = lock.acquire(timeout=0)
+            except Exception:
+                # Lease backend down: don't leave the account marked busy
+                self._release(email)
+                raise
+            if acquired:
+                break
+            elsewhere.add(email)
+            self._release(email)
+
+        with self._cond:
+            self._last_lease[email] = time.time()
+        try:
+            yield account, self.pools[email]
+        finally:
+            lock.release()
+            self._release(email)
+
+    def _release(self, email):
+        with self._cond:
+            self._busy.discard(email)
+            self._cond.notify_all()
+
+    def warm(self):
+        for pool in self.pools.values():
+            pool.warm()
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
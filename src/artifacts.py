@@ -0,0 +1,182 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ARTIFACT_DIR = os.getenv(
+    "ARTIFACT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".artifacts"),
+)
+ARTIFACT_MAX_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", str(200 * 1024 * 1024)))
+ARTIFACTS_ENABLED = os.getenv("ARTIFACTS_ENABLED", "1") == "1"
+
+QUOTE_JSON_JS = """
+try {
+    const ko = require('ko');
+    const q = require('Magento_Checkout/js/model/quote');
+    return JSON.stringify({
+        shippingAddress: ko.toJS(q.shippingAddress()),
+        billingAddress: ko.toJS(q.billingAddress()),
+        shippingMethod: ko.toJS(q.shippingMethod()),
+        paymentMethod: ko.toJS(q.paymentMethod()),
+        totals: ko.toJS(q.totals())
+    });
+} catch(e) { return null; }
+"""
+
+# Resource Timing is read instead of the performance log so the per-order
+# resource report still sees every request.
+NETWORK_JS = """
+return performance.getEntriesByType('resource').map(e => ({
+    name: e.name, type: e.initiatorType, start: Math.round(e.startTime),
+    duration: Math.round(e.duration), bytes: e.transferSize, status: e.responseStatus
+}));
+"""
+
+
+def _safe(name):
+    return re.sub(r"[^\w.-]", "_", str(name))[:80] or "unknown"
+
+
+class ArtifactStore:
+    """Compressed failure artifacts on disk, indexed by order and stage.
+
+    Writing happens on one background thread; the oldest captures are
+    deleted once the store grows past `max_bytes`.
+    """
+
+    def __init__(self, root=ARTIFACT_DIR, max_bytes=ARTIFACT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, order_id TEXT NOT NULL,"
+            " stage TEXT NOT NULL, error TEXT, url TEXT, path TEXT NOT NULL,"
+            " bytes INTEGER NOT NULL, created REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS artifacts_order ON artifacts (order_id)")
+        self._db.commit()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifacts")
+
+    def submit(self, capture):
+        self._writer.submit(self._write, capture)
+
+    def _write(self, capture):
+        created = capture["created"]
+        path = os.path.join(
+            self.root,
+            _safe(capture["order_id"]),
+            f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(created))}-{_safe(capture['stage'])}",
+        )
+        try:
+            os.makedirs(path, exist_ok=True)
+            size = 0
+            if capture.get("screenshot"):
+                # PNG is already compressed
+                with open(os.path.join(path, "screenshot.png"), "wb") as f:
+                    f.write(capture["screenshot"])
+            for name, data in capture["files"].items():
+                if data is None:
+                    continue
+                if not isinstance(data, str):
+                    data = json.dumps(data, indent=1, default=str)
+                with gzip.open(os.path.join(path, f"{name}.gz"), "wt", encoding="utf-8") as f:
+                    f.write(data)
+            for entry in os.scandir(path):
+                size += entry.stat().st_size
+            with self._lock:
+                self._db.execute(
+                    "INSERT INTO artifacts (order_id, stage, error, url, path, bytes, created)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        str(capture["order_id"]), capture["stage"], capture["error"],
+                        capture["url"], path, size, created,
+                    ),
+                )
+                self._db.commit()
+            print(f"🗂️ Failure artifacts for {capture['order_id']}/{capture['stage']}: {path}")
+            self._rotate()
+        except Exception as e:
+            print("⚠️ Could not write failure artifacts:", repr(e))
+
+    def _rotate(self):
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM artifacts").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self._db.execute("SELECT id, path, bytes FROM artifacts ORDER BY created").fetchall()
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(row["path"], ignore_errors=True)
+                self._db.execute("DELETE FROM artifacts WHERE id = ?", (row["id"],))
+                total -= row["bytes"]
+            self._db.commit()
+
+    def for_order(self, order_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM artifacts WHERE order_id = ? ORDER BY created DESC",
+                (str(order_id),),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def flush(self):
+        """Block until every queued capture is on disk."""
+        self._writer.submit(lambda: None).result()
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_artifact_store():
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ArtifactStore()
+    return _default_store
+
+
+def _grab(what, func):
+    try:
+        return func()
+    except Exception as e:
+        print(f"⚠️ Could not capture {what}:", repr(e))
+        return None
+
+
+def capture_failure(driver, order_id, stage, error):
+    """Snapshot the browser now and hand the writing to the background thread.
+
+    Only the WebDriver reads run on the caller's thread.
+    """
+    if not ARTIFACTS_ENABLED or driver is None:
+        return
+    capture = {
+        "order_id": order_id,
+        "stage": stage or "unknown",
+        "error": repr(error),
+        "created": time.time(),
+        "url": _grab("url", lambda: driver.current_url),
+        "screenshot": _grab("screenshot", driver.get_screenshot_as_png),
+        "files": {
+            "page.html": _grab("page source", lambda: driver.page_source),
+            "quote.json": _grab("quote", lambda: driver.execute_script(QUOTE_JSON_JS)),
+            "console.json": _grab("console log", lambda: driver.get_log("browser")),
+            "network.json": _grab("network log", lambda: driver.execute_script(NETWORK_JS)),
+        },
+    }
+    get_artifact_store().submit(capture)
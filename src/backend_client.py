@@ -0,0 +1,199 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BACKEND_URL = os.getenv("BACKEND_URL", "http://31.97.78.137:3005")
+# BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:3005")
+
+BACKEND_POOL_SIZE = int(os.getenv("BACKEND_POOL_SIZE", "10"))
+BACKEND_MAX_CONCURRENCY = int(os.getenv("BACKEND_MAX_CONCURRENCY", "8"))
+BACKEND_RETRIES = int(os.getenv("BACKEND_RETRIES", "5"))
+BACKEND_BACKOFF = float(os.getenv("BACKEND_BACKOFF", "0.5"))
+BACKEND_TIMEOUT = float(os.getenv("BACKEND_TIMEOUT", "15"))
+BACKEND_OUTBOX_PATH = os.getenv(
+    "BACKEND_OUTBOX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".backend_outbox.sqlite3"),
+)
+
+
+class BackendClient:
+    """Keep-alive, retrying client for the order-history backend.
+
+    Every write carries an Idempotency-Key derived from what it writes, so
+    retries (including outbox replays after an outage) are safe. Writes that
+    still fail after all retries are parked in a local outbox and replayed
+    in the background whenever another write comes in, so a backlog never
+    slows the write that triggered it down.
+    """
+
+    def __init__(self, base_url=BACKEND_URL, outbox_path=BACKEND_OUTBOX_PATH):
+        self.base_url = base_url.rstrip("/")
+        self.http = requests.Session()
+        retry = Retry(
+            total=BACKEND_RETRIES,
+            backoff_factor=BACKEND_BACKOFF,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=2, pool_maxsize=BACKEND_POOL_SIZE, max_retries=retry
+        )
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(BACKEND_MAX_CONCURRENCY)
+        self._outbox_lock = threading.Lock()
+        # One replay at a time; concurrent writers skip rather than resend
+        # the same rows.
+        self._replay_lock = threading.Lock()
+        self._outbox = sqlite3.connect(outbox_path, check_same_thread=False)
+        self._outbox.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " key TEXT PRIMARY KEY, path TEXT NOT NULL, body TEXT NOT NULL,"
+            " created REAL NOT NULL)"
+        )
+        self._outbox.commit()
+
+    def _request(self, method, path, key=None, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if key:
+            headers["Idempotency-Key"] = key
+        with self._slots:
+            return self.http.request(
+                method,
+                f"{self.base_url}{path}",
+                headers=headers,
+                timeout=kwargs.pop("timeout", BACKEND_TIMEOUT),
+                **kwargs,
+            )
+
+    def _post(self, path, body, key):
+        """POST that lands in the outbox instead of being lost."""
+        self._replay_soon()
+        try:
+            res = self._request("POST", path, key=key, json=body)
+            res.raise_for_status()
+            return res
+        except requests.RequestException as e:
+            self._park(path, body, key, e)
+            raise
+
+    def _retryable(self, error):
+        # A 4xx will not get better by replaying it later.
+        response = getattr(error, "response", None)
+        return response is None or response.status_code >= 500
+
+    def _park(self, path, body, key, error):
+        if not self._retryable(error):
+            print(f"❌ Backend rejected write: {path}", repr(error))
+            return
+        print(f"❌ Backend write failed, queued for replay: {path}", repr(error))
+        with self._outbox_lock:
+            self._outbox.execute(
+                "INSERT OR IGNORE INTO outbox (key, path, body, created) VALUES (?, ?, ?, ?)",
+                (key, path, json.dumps(body), time.time()),
+            )
+            self._outbox.commit()
+
+    def _replay_soon(self):
+        """Start replay_outbox() on a background thread if anything is parked."""
+        if self._replay_lock.locked():
+            return
+        with self._outbox_lock:
+            pending = self._outbox.execute("SELECT 1 FROM outbox LIMIT 1").fetchone()
+        if pending:
+            threading.Thread(target=self.replay_outbox, name="outbox-replay", daemon=True).start()
+
+    def replay_outbox(self):
+        if not self._replay_lock.acquire(blocking=False):
+            return
+        try:
+            self._replay()
+        finally:
+            self._replay_lock.release()
+
+    def _replay(self):
+        with self._outbox_lock:
+            pending = self._outbox.execute(
+                "SELECT key, path, body FROM outbox ORDER BY created"
+            ).fetchall()
+        for key, path, body in pending:
+            try:
+                res = self._request("POST", path, key=key, json=json.loads(body))
+                res.raise_for_status()
+                print(f"📬 Replayed queued backend write: {path}")
+            except requests.RequestException as e:
+                if self._retryable(e):
+                    return
+                print(f"❌ Dropping queued backend write: {path}", repr(e))
+            with self._outbox_lock:
+                self._outbox.execute("DELETE FROM outbox WHERE key = ?", (key,))
+                self._outbox.commit()
+
+    def get_json(self, path, **kwargs):
+        res = self._request("GET", path, **kwargs)
+        res.raise_for_status()
+        return res.json()
+
+    def fetch_order(self, order_id):
+        return self.get_json(f"/v1/order-history/internal/{order_id}")
+
+    def sync_order(self, order_id, supplier_order_number, status="ORDERED_AT_SUPPLIER"):
+        return self._post(
+            f"/v1/order-history/order-sync/{order_id}",
+            {"supplierOrderNumber": supplier_order_number, "status": status},
+            key=f"order-sync:{order_id}:{supplier_order_number}:{status}",
+        )
+
+    def _tracking_id_write(self, supplier_order_number, tracking_id):
+        return (
+            "/v1/order-history/save-tracking-id",
+            {"supplierOrderNumber": supplier_order_number, "trackingNumber": tracking_id},
+            f"tracking:{supplier_order_number}:{tracking_id}",
+        )
+
+    def save_tracking_id(self, supplier_order_number, tracking_id):
+        path, body, key = self._tracking_id_write(supplier_order_number, tracking_id)
+        return self._post(path, body, key=key)
+
+    def save_tracking_ids(self, supplier_order_number, tracking_ids):
+        """Send every tracking number of an order in one request.
+
+        Falls back to one request per number when the backend does not
+        offer the batch endpoint.
+        """
+        tracking_ids = sorted(tracking_ids)
+        path = "/v1/order-history/save-tracking-ids"
+        body = {"supplierOrderNumber": supplier_order_number, "trackingNumbers": tracking_ids}
+        key = f"tracking:{supplier_order_number}:{','.join(tracking_ids)}"
+        self._replay_soon()
+        try:
+            res = self._request("POST", path, key=key, json=body)
+            if res.status_code not in (404, 405):
+                res.raise_for_status()
+                return [res]
+        except requests.RequestException as e:
+            # Parked as single writes: every backend has that endpoint, so
+            # a replay can't be dropped as a 404 from a missing batch route.
+            for t in tracking_ids:
+                self._park(*self._tracking_id_write(supplier_order_number, t), e)
+            raise
+        return [self.save_tracking_id(supplier_order_number, t) for t in tracking_ids]
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_backend_client():
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = BackendClient()
+    return _default_client
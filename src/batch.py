@@ -0,0 +1,57 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from accounts import AccountScheduler
+from concurrency import placement_limiter
+from place_order import place_order, prefetch_order_data
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "3"))
+
+
+def _place_one(scheduler, order_id):
+    start = time.monotonic()
+    result = {"orderId": order_id, "success": False, "supplierOrderNumber": None}
+    try:
+        with placement_limiter.slot(), scheduler.lease(order_id) as (account, pool):
+            result["account"] = account["email"]
+            with pool.driver() as driver:
+                supplier_no = place_order(driver, order_id, account=account["email"])
+        result["success"] = bool(supplier_no)
+        result["supplierOrderNumber"] = supplier_no
+    except Exception as e:
+        result["error"] = repr(e)
+    result["seconds"] = round(time.monotonic() - start, 1)
+    return result
+
+
+def place_orders_batch(order_ids, workers=BATCH_WORKERS, scheduler=None):
+    """Place many orders concurrently, sharded over the supplier accounts.
+
+    Each worker leases a free account and one of its pooled sessions; an
+    account never has two checkouts in flight, so real parallelism is
+    min(workers, accounts). Returns one result dict per unique order id,
+    in input order.
+    """
+    order_ids = list(dict.fromkeys(str(o) for o in order_ids))
+    own_scheduler = scheduler is None
+    if own_scheduler:
+        scheduler = AccountScheduler()
+
+    # Fetch every payload up front so no browser waits on the backend.
+    prefetch_order_data(order_ids)
+
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_place_one, scheduler, o) for o in order_ids]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result["orderId"]] = result
+                print("BATCH_RESULT:" + json.dumps(result))
+    finally:
+        if own_scheduler:
+            scheduler.close()
+
+    return [results[o] for o in order_ids]
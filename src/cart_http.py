@@ -0,0 +1,341 @@
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from sku_cache import get_sku_index
+from utils import STORE_URL
+
+CART_HTTP_ENABLED = os.getenv("CART_HTTP_ENABLED", "1") == "1"
+CART_HTTP_RESOLVE_WORKERS = int(os.getenv("CART_HTTP_RESOLVE_WORKERS", "4"))
+
+# Keyed by the driver object, so entries go away with their driver
+_sessions = weakref.WeakKeyDictionary()
+_sessions_lock = threading.Lock()
+
+
+class _ToCartFormParser(HTMLParser):
+    """Collects every add-to-cart form on a search results page."""
+
+    def __init__(self):
+        super().__init__()
+        self.forms = []
+        self._current = None
+        self._last_link = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a" and "product-item-link" in (attrs.get("class") or ""):
+            self._last_link = attrs.get("href")
+        elif tag == "form" and attrs.get("data-role") == "tocart-form":
+            self._current = {
+                "action": attrs.get("action"),
+                "product": None,
+                "url": self._last_link,
+            }
+        elif tag == "input" and self._current is not None:
+            if attrs.get("name") == "product":
+                self._current["product"] = attrs.get("value")
+
+    def handle_endtag(self, tag):
+        if tag == "form" and self._current is not None:
+            if self._current["action"] and self._current["product"]:
+                self.forms.append(self._current)
+            self._current = None
+
+
+def parse_tocart_forms(html):
+    parser = _ToCartFormParser()
+    parser.feed(html)
+    return parser.forms
+
+
+def http_session(driver):
+    """Pooled requests.Session per browser session, carrying its cookies."""
+    with _sessions_lock:
+        http = _sessions.get(driver)
+        if http is None:
+            http = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=CART_HTTP_RESOLVE_WORKERS)
+            http.mount("https://", adapter)
+            http.mount("http://", adapter)
+            http.headers["User-Agent"] = driver.execute_script("return navigator.userAgent;")
+            _sessions[driver] = http
+
+    for c in driver.get_cookies():
+        http.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+    return http
+
+
+def forget_http_session(driver):
+    """Close the driver's requests session; call when the driver is quit."""
+    with _sessions_lock:
+        http = _sessions.pop(driver, None)
+    if http is not None:
+        http.close()
+
+
+def form_key(http):
+    for cookie in http.cookies:
+        if cookie.name == "form_key":
+            return cookie.value
+    return None
+
+
+def resolve_product(http, sku):
+    """Search the storefront for a SKU and return its first add-to-cart form."""
+    res = http.get(
+        f"{STORE_URL}/catalogsearch/result/",
+        params={"q": sku},
+        timeout=20,
+    )
+    res.raise_for_status()
+    forms = parse_tocart_forms(res.text)
+    return forms[0] if forms else None
+
+
+def add_to_cart(http, product, qty, key):
+    res = http.post(
+        product["action"],
+        data={"product": product["product"], "qty": qty, "form_key": key},
+        headers={"X-Requested-With": "XMLHttpRequest"},
+        timeout=20,
+    )
+    res.raise_for_status()
+    try:
+        body = res.json()
+    except ValueError:
+        return False
+    # Magento answers with a backUrl when the product cannot be added
+    # straight from a listing (options required, out of stock, ...).
+    return not (isinstance(body, dict) and body.get("backUrl"))
+
+
+def cart_summary_count(http):
+    res = http.get(
+        f"{STORE_URL}/customer/section/load/",
+        params={"sections": "cart", "force_new_section_timestamp": "true"},
+        headers={"X-Requested-With": "XMLHttpRequest"},
+        timeout=15,
+    )
+    res.raise_for_status()
+    return int((res.json().get("cart") or {}).get("summary_count") or 0)
+
+
+def populate_cart_http(driver, products):
+    """Add every order line over HTTP with the browser's session cookies.
+
+    SKUs are resolved concurrently, then posted to the cart one by one so
+    Magento never sees two writes to the same quote at once. Returns the
+    lines that could not be added; the caller falls back to the UI flow
+    for those.
+    """
+    if not CART_HTTP_ENABLED or not products:
+        return list(products)
+
+    http = http_session(driver)
+    key = form_key(http)
+    if not key:
+        print("⚠️ No form_key cookie, skipping HTTP cart population")
+        return list(products)
+
+    skus = [str(line["sku"]).strip() for line in products]
+    index = get_sku_index()
+    from_cache = set()
+
+    def resolve(sku, use_cache=True):
+        if use_cache:
+            cached = index.get(sku)
+            if cached:
+                from_cache.add(sku)
+                return cached
+        try:
+            product = resolve_product(http, sku)
+        except Exception as e:
+            print(f"⚠️ Could not resolve SKU {sku} over HTTP:", repr(e))
+            return index.get_stale(sku)
+        if product:
+            index.put(sku, product)
+        return product
+
+    with ThreadPoolExecutor(max_workers=CART_HTTP_RESOLVE_WORKERS) as executor:
+        resolved = list(executor.map(resolve, skus))
+
+    failed = []
+    # Adds that raised (e.g. timed out) may still have landed server-side
+    uncertain = []
+    added_qty = 0
+    for line, sku, product in zip(products, skus, resolved):
+        qty = int(line["qty"])
+        try:
+            ok = product is not None and add_to_cart(http, product, qty, key)
+            if not ok and sku in from_cache:
+                # The cached form may be outdated; search once more.
+                index.invalidate(sku)
+                product = resolve(sku, use_cache=False)
+                ok = product is not None and add_to_cart(http, product, qty, key)
+        except Exception as e:
+            print(f"⚠️ HTTP add-to-cart failed for {sku}:", repr(e))
+            uncertain.append(line)
+            continue
+        if ok:
+            added_qty += qty
+            print(f"🛒 SKU {sku} x{qty} added over HTTP")
+        else:
+            failed.append(line)
+
+    if uncertain:
+        # Re-read the cart so the UI fallback doesn't add them a second time
+        try:
+            in_cart = {}
+            for item in read_cart_items(http):
+                item_sku = str(item.get("product_sku", "")).strip().lower()
+                in_cart[item_sku] = in_cart.get(item_sku, 0) + int(item.get("qty") or 0)
+        except Exception as e:
+            print("⚠️ Could not re-read cart after failed adds:", repr(e))
+            in_cart = {}
+        for line in uncertain:
+            sku = str(line["sku"]).strip()
+            if in_cart.get(sku.lower(), 0) >= int(line["qty"]):
+                added_qty += int(line["qty"])
+                print(f"🛒 SKU {sku} reached the cart despite the error")
+            else:
+                failed.append(line)
+
+    print("📇 SKU index:", index.stats)
+    try:
+        print(f"🛒 Cart now holds {cart_summary_count(http)} item(s), {added_qty} added over HTTP")
+    except Exception as e:
+        print("⚠️ Could not read cart summary:", repr(e))
+
+    # The browser's cached minicart is now stale.
+    driver.execute_script(
+        """
+        try {
+            require('Magento_Customer/js/customer-data').invalidate(['cart']);
+        } catch(e) {}
+        """
+    )
+    return failed
+
+
+def read_cart_items(http):
+    """Current cart lines from Magento's customer-data cart section."""
+    res = http.get(
+        f"{STORE_URL}/customer/section/load/",
+        params={"sections": "cart", "force_new_section_timestamp": "true"},
+        headers={"X-Requested-With": "XMLHttpRequest"},
+        timeout=15,
+    )
+    res.raise_for_status()
+    return (res.json().get("cart") or {}).get("items") or []
+
+
+def _sidebar_post(http, action, data):
+    res = http.post(
+        f"{STORE_URL}/checkout/sidebar/{action}/",
+        data=data,
+        headers={"X-Requested-With": "XMLHttpRequest"},
+        timeout=20,
+    )
+    res.raise_for_status()
+    if not res.json().get("success"):
+        raise Exception(f"{action} rejected: {res.text[:200]}")
+
+
+def _cart_diff(items, products):
+    """(removes, updates, adds) that turn the cart `items` into `products`."""
+    wanted = {}
+    for line in products:
+        sku = str(line["sku"]).strip()
+        entry = wanted.setdefault(sku.lower(), {"sku": sku, "qty": 0})
+        entry["qty"] += int(line["qty"])
+
+    current = {}
+    for item in items:
+        current.setdefault(str(item.get("product_sku", "")).strip().lower(), []).append(item)
+
+    removes, updates, adds = [], [], []
+    for sku, cart_items in current.items():
+        if sku not in wanted:
+            removes.extend(cart_items)
+            continue
+        keep, extra = cart_items[0], cart_items[1:]
+        removes.extend(extra)
+        if int(keep.get("qty") or 0) != wanted[sku]["qty"]:
+            updates.append((keep, wanted[sku]["qty"]))
+    for sku, line in wanted.items():
+        if sku not in current:
+            adds.append(line)
+    return removes, updates, adds
+
+
+def cart_matches(driver, products):
+    """True when the live cart holds exactly the order's lines."""
+    try:
+        items = read_cart_items(http_session(driver))
+    except Exception as e:
+        print("⚠️ Could not read cart section:", repr(e))
+        return False
+    return not any(_cart_diff(items, products))
+
+
+def reconcile_cart(driver, products):
+    """Bring the cart in line with `products` using only the needed edits.
+
+    Lines the order does not want are removed, quantities are corrected in
+    place and missing SKUs are added over HTTP. Returns the lines that still
+    need the UI add-to-cart flow, or None when the cart could not be read or
+    edited and the caller should clear it and start over.
+    """
+    if not CART_HTTP_ENABLED:
+        return None
+
+    http = http_session(driver)
+    key = form_key(http)
+    if not key:
+        return None
+
+    try:
+        items = read_cart_items(http)
+    except Exception as e:
+        print("⚠️ Could not read cart section:", repr(e))
+        return None
+
+    removes, updates, adds = _cart_diff(items, products)
+    if not (removes or updates or adds):
+        print("✅ Cart already matches the order")
+        return []
+
+    print(
+        f"🔧 Reconciling cart: {len(removes)} remove(s), "
+        f"{len(updates)} qty update(s), {len(adds)} add(s)"
+    )
+    try:
+        for item in removes:
+            _sidebar_post(http, "removeItem", {"item_id": item["item_id"], "form_key": key})
+        for item, qty in updates:
+            _sidebar_post(
+                http,
+                "updateItemQty",
+                {"item_id": item["item_id"], "item_qty": qty, "form_key": key},
+            )
+    except Exception as e:
+        print("⚠️ Cart reconcile failed:", repr(e))
+        return None
+
+    if adds:
+        return populate_cart_http(driver, adds)
+
+    driver.execute_script(
+        """
+        try {
+            require('Magento_Customer/js/customer-data').invalidate(['cart']);
+        } catch(e) {}
+        """
+    )
+    return []
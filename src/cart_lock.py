@@ -0,0 +1,73 @@
+import os
+import threading
+
+from leases import LeaseBusyError, get_lease_manager
+
+# Seconds to wait for another worker (thread, process or host) to finish
+# with an account's cart.
+CART_LOCK_TIMEOUT = float(os.getenv("CART_LOCK_TIMEOUT", "600"))
+
+
+class CartLock:
+    """Ownership of one account's cart.
+
+    A Magento customer has exactly one cart, so every session logged in to
+    the same account shares it. The local RLock serialises threads; the
+    outermost holder also takes a heartbeated lease so other processes and
+    hosts keep out too. Re-entrant so a thread holding the account's lease
+    (accounts.AccountScheduler) can enter place_order's own lock.
+    """
+
+    def __init__(self, account):
+        self.account = account
+        self._local = threading.RLock()
+        self._depth = 0
+        self._lease = None
+
+    def acquire(self, timeout=CART_LOCK_TIMEOUT):
+        """False if the cart stayed busy for `timeout` seconds (0: don't wait)."""
+        if not self._local.acquire(timeout=-1 if timeout is None else timeout):
+            return False
+        if self._depth == 0:
+            try:
+                self._lease = get_lease_manager().acquire(f"cart:{self.account}", timeout=timeout)
+            except LeaseBusyError:
+                self._local.release()
+                return False
+            except Exception:
+                self._local.release()
+                raise
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            lease, self._lease = self._lease, None
+            lease.release()
+        self._local.release()
+
+    def __enter__(self):
+        if not self.acquire():
+            raise TimeoutError(f"Cart of {self.account} still busy after {CART_LOCK_TIMEOUT}s")
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def check(self):
+        if self._lease is not None:
+            self._lease.check()
+
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def cart_lock(account=None):
+    account = account or os.getenv("SUPPLIER_EMAIL", "")
+    with _locks_guard:
+        lock = _locks.get(account)
+        if lock is None:
+            lock = _locks[account] = CartLock(account)
+    return lock
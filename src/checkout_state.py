@@ -0,0 +1,207 @@
+import os
+import sqlite3
+import threading
+import time
+
+from leases import get_lease_manager
+
+CHECKPOINT_DB_PATH = os.getenv(
+    "CHECKPOINT_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".checkpoints.sqlite3"),
+)
+# Checkpoints and finished submissions older than this are deleted; 0 keeps all
+CHECKPOINT_RETENTION_DAYS = float(os.getenv("CHECKPOINT_RETENTION_DAYS", "90"))
+CHECKPOINT_PRUNE_INTERVAL = 3600
+
+# Checkout states in order; each one implies every state before it.
+STATES = (
+    "start",
+    "cart_populated",
+    "address_set",
+    "shipping_selected",
+    "payment_selected",
+    "billing_set",
+    "submitted",
+)
+
+
+def state_index(state):
+    return STATES.index(state)
+
+
+class CheckpointStore:
+    """Last good checkout state per order, plus the durable submit guard.
+
+    A submission row is written before the place-order button is clicked
+    and only removed by clear() or, once the supplier order number is
+    known, by age (the shared "submit:<id>" claim stays), so an order
+    cannot be submitted twice even across retries, processes, hosts or
+    browser sessions.
+    """
+
+    def __init__(self, path=CHECKPOINT_DB_PATH):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " order_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        # Added after the first release; older databases lack the column.
+        try:
+            self._db.execute("ALTER TABLE checkpoints ADD COLUMN account TEXT")
+        except sqlite3.OperationalError:
+            pass
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS submissions ("
+            " order_id TEXT PRIMARY KEY, claimed REAL NOT NULL,"
+            " supplier_order_number TEXT)"
+        )
+        self._db.commit()
+        self._last_prune = 0.0
+        self.prune()
+
+    def prune(self, max_age_days=CHECKPOINT_RETENTION_DAYS):
+        """Delete old checkpoints and finished submissions; at most once an hour.
+
+        Submissions without a supplier order number are kept: their outcome
+        is unknown until someone checks the supplier and clears them.
+        """
+        if max_age_days <= 0:
+            return
+        now = time.time()
+        cutoff = now - max_age_days * 86400
+        with self._lock:
+            if now - self._last_prune < CHECKPOINT_PRUNE_INTERVAL:
+                return
+            self._last_prune = now
+            checkpoints = self._db.execute(
+                "DELETE FROM checkpoints WHERE updated < ?", (cutoff,)
+            ).rowcount
+            submissions = self._db.execute(
+                "DELETE FROM submissions WHERE claimed < ? AND supplier_order_number IS NOT NULL",
+                (cutoff,),
+            ).rowcount
+            self._db.commit()
+        if checkpoints or submissions:
+            print(
+                f"🧹 Removed {checkpoints} checkpoint(s) and {submissions} submission(s)"
+                f" older than {max_age_days:g} days"
+            )
+
+    def _drop_if_cleared(self, order_id):
+        """Forget local rows older than a clear() run on any host.
+
+        clear() leaves a "cleared:<id>" marker in the shared lease backend;
+        every host drops its own checkpoint and submission rows for the
+        order once it sees one newer than them.
+        """
+        cleared = get_lease_manager().holder(f"cleared:{order_id}")
+        if not cleared:
+            return
+        cleared = float(cleared)
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM checkpoints WHERE order_id = ? AND updated < ?", (str(order_id), cleared)
+            )
+            self._db.execute(
+                "DELETE FROM submissions WHERE order_id = ? AND claimed < ?", (str(order_id), cleared)
+            )
+            self._db.commit()
+
+    def get(self, order_id):
+        self._drop_if_cleared(order_id)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state FROM checkpoints WHERE order_id = ?", (str(order_id),)
+            ).fetchone()
+        return row["state"] if row else "start"
+
+    def account(self, order_id):
+        """Supplier account whose cart holds the order's checkpointed state."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT account FROM checkpoints WHERE order_id = ?", (str(order_id),)
+            ).fetchone()
+        return row["account"] if row else None
+
+    def account_for_supplier_order(self, supplier_order_number):
+        """Supplier account that placed the order with this supplier number."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT c.account FROM submissions s JOIN checkpoints c ON c.order_id = s.order_id"
+                " WHERE s.supplier_order_number = ?",
+                (str(supplier_order_number),),
+            ).fetchone()
+        return row["account"] if row else None
+
+    def save(self, order_id, state, account=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints (order_id, state, updated, account)"
+                " VALUES (?, ?, ?, ?)",
+                (str(order_id), state, time.time(), account),
+            )
+            self._db.commit()
+        self.prune()
+
+    def clear(self, order_id):
+        """Forget the checkpoint and submit guard; only after a manual check.
+
+        Takes effect on every host sharing the lease backend.
+        """
+        get_lease_manager().mark(f"cleared:{order_id}", time.time())
+        with self._lock:
+            self._db.execute("DELETE FROM checkpoints WHERE order_id = ?", (str(order_id),))
+            self._db.execute("DELETE FROM submissions WHERE order_id = ?", (str(order_id),))
+            self._db.commit()
+        get_lease_manager().unclaim(f"submit:{order_id}")
+
+    def submission(self, order_id):
+        self._drop_if_cleared(order_id)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM submissions WHERE order_id = ?", (str(order_id),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def claim_submit(self, order_id):
+        """Record the intent to submit; False if the order was claimed before.
+
+        The claim is also taken in the lease backend, which other hosts
+        share, before the local row is written.
+        """
+        if not get_lease_manager().claim(f"submit:{order_id}"):
+            return False
+        self._drop_if_cleared(order_id)
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT INTO submissions (order_id, claimed) VALUES (?, ?)",
+                    (str(order_id), time.time()),
+                )
+                self._db.commit()
+            except sqlite3.IntegrityError:
+                return False
+        return True
+
+    def finish_submit(self, order_id, supplier_order_number, account=None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE submissions SET supplier_order_number = ? WHERE order_id = ?",
+                (supplier_order_number, str(order_id)),
+            )
+            self._db.commit()
+        self.save(order_id, "submitted", account)
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_checkpoint_store():
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = CheckpointStore()
+    return _default_store
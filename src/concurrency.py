@@ -0,0 +1,287 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from selenium.common.exceptions import WebDriverException
+
+from metrics import Gauge, add_stage_listener, failed_stage
+
+ADAPTIVE_MIN_CONCURRENCY = int(os.getenv("ADAPTIVE_MIN_CONCURRENCY", "1"))
+ADAPTIVE_MAX_CONCURRENCY = int(os.getenv("ADAPTIVE_MAX_CONCURRENCY", "4"))
+# A stage slower than this multiple of its running average counts as congestion
+ADAPTIVE_SLOW_FACTOR = float(os.getenv("ADAPTIVE_SLOW_FACTOR", "3"))
+# Minimum seconds between two multiplicative decreases
+ADAPTIVE_DECREASE_COOLDOWN = float(os.getenv("ADAPTIVE_DECREASE_COOLDOWN", "30"))
+# Stages whose duration depends on the order size rather than the storefront
+ADAPTIVE_IGNORE_STAGES = set(
+    os.getenv(
+        "ADAPTIVE_IGNORE_STAGES",
+        "checkout,state_cart_populated,add_products_to_cart,populate_cart_http",
+    ).split(",")
+)
+
+# Stages with a circuit breaker
+BREAKER_STAGES = set(os.getenv("BREAKER_STAGES", "login,checkout").split(","))
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "10"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "4"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "60"))
+
+CONCURRENCY_LIMIT = Gauge(
+    "adaptive_concurrency_limit",
+    "Current number of browsers allowed to work on the storefront.",
+    labels=("workload",),
+)
+CONCURRENCY_INFLIGHT = Gauge(
+    "adaptive_concurrency_inflight",
+    "Browsers currently working on the storefront.",
+    labels=("workload",),
+)
+BREAKER_OPEN = Gauge(
+    "circuit_breaker_open",
+    "1 while the breaker for a stage is open, 0.5 while half-open.",
+    labels=("stage",),
+)
+
+_active = threading.local()
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def is_storefront_error(error):
+    """Errors that say the storefront is slow or down, not that the order is bad."""
+    return isinstance(
+        error, (WebDriverException, requests.RequestException, TimeoutError, ConnectionError)
+    )
+
+
+def _caused_by_storefront(error):
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if is_storefront_error(error):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class CircuitBreaker:
+    """Opens when too many recent calls of one stage failed against the storefront.
+
+    After `reset_seconds` one probe is let through (half-open); its
+    outcome closes or re-opens the breaker.
+    """
+
+    def __init__(
+        self,
+        stage,
+        window=BREAKER_WINDOW,
+        min_calls=BREAKER_MIN_CALLS,
+        error_rate=BREAKER_ERROR_RATE,
+        reset_seconds=BREAKER_RESET_SECONDS,
+    ):
+        self.stage = stage
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._results = []
+        self._opened_at = None
+        self._probe_at = None
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.time() - self._opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "open":
+                return False
+            # Half-open: one probe at a time, a stuck probe is replaced
+            if self._probe_at is None or time.time() - self._probe_at > self.reset_seconds:
+                self._probe_at = time.time()
+                return True
+            return False
+
+    def record(self, ok):
+        with self._lock:
+            if self._state() == "half_open":
+                self._probe_at = None
+                if ok:
+                    self._results = []
+                    self._opened_at = None
+                    print(f"✅ Circuit for '{self.stage}' closed")
+                else:
+                    self._opened_at = time.time()
+                self._publish()
+                return
+
+            self._results = (self._results + [ok])[-self.window:]
+            failures = self._results.count(False)
+            if (
+                self._opened_at is None
+                and len(self._results) >= self.min_calls
+                and failures / len(self._results) >= self.error_rate
+            ):
+                self._opened_at = time.time()
+                print(f"🚨 Circuit for '{self.stage}' opened ({failures}/{len(self._results)} failed)")
+            self._publish()
+
+    def _publish(self):
+        value = {"closed": 0, "open": 1, "half_open": 0.5}[self._state()]
+        BREAKER_OPEN.set(value, stage=self.stage)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(stage):
+    with _breakers_lock:
+        breaker = _breakers.get(stage)
+        if breaker is None:
+            breaker = _breakers[stage] = CircuitBreaker(stage)
+    return breaker
+
+
+class AdaptiveLimiter:
+    """AIMD limit on concurrent browser work for one workload.
+
+    Every successful slot adds 1/limit (about +1 per `limit` successes);
+    a slow stage, or a storefront error that ends the job, halves the
+    limit, at most once per cooldown. Errors a caller handles (e.g. by
+    falling back to another approach) don't count. While any of `breaker_stages` is open, slots fail fast with
+    CircuitOpenError instead of queueing.
+    """
+
+    def __init__(
+        self,
+        name,
+        breaker_stages=(),
+        min_limit=ADAPTIVE_MIN_CONCURRENCY,
+        max_limit=ADAPTIVE_MAX_CONCURRENCY,
+        initial=None,
+    ):
+        self.name = name
+        self.breaker_stages = tuple(breaker_stages)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(initial or max_limit)
+        self.inflight = 0
+        self._cond = threading.Condition()
+        self._latency = {}
+        self._last_decrease = 0.0
+        self._publish()
+
+    def _publish(self):
+        CONCURRENCY_LIMIT.set(int(self.limit), workload=self.name)
+        CONCURRENCY_INFLIGHT.set(self.inflight, workload=self.name)
+
+    def _check_breakers(self, probe=False):
+        """Raise CircuitOpenError if a breaker is open.
+
+        Only the final check (`probe=True`) may take a half-open breaker's
+        single probe.
+        """
+        for stage in self.breaker_stages:
+            breaker = get_breaker(stage)
+            ok = breaker.allow() if probe else breaker.state != "open"
+            if not ok:
+                raise CircuitOpenError(f"Storefront '{stage}' is failing; circuit open")
+
+    @contextmanager
+    def slot(self, timeout=None):
+        """Hold one unit of concurrency for the duration of a job."""
+        self._check_breakers()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No {self.name} slot free within {timeout}s")
+                self._cond.wait(timeout=remaining if remaining is not None else 5)
+                self._check_breakers()
+            self._check_breakers(probe=True)
+            self.inflight += 1
+            self._publish()
+
+        _active.limiter = self
+        _active.congested = False
+        try:
+            yield
+        except Exception as e:
+            if _caused_by_storefront(e):
+                self._decrease(f"{failed_stage(e) or self.name} failed")
+            raise
+        else:
+            if not _active.congested:
+                self._increase()
+        finally:
+            _active.limiter = None
+            with self._cond:
+                self.inflight -= 1
+                self._publish()
+                self._cond.notify_all()
+
+    def _increase(self):
+        with self._cond:
+            self.limit = min(self.max_limit, self.limit + 1 / max(self.limit, 1))
+            self._publish()
+            self._cond.notify_all()
+
+    def _decrease(self, reason):
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease < ADAPTIVE_DECREASE_COOLDOWN:
+                return
+            old = self.limit
+            if old <= self.min_limit:
+                return
+            self._last_decrease = now
+            self.limit = max(self.min_limit, self.limit / 2)
+            self._publish()
+        print(f"📉 {self.name} concurrency {int(old)} → {int(self.limit)} ({reason})")
+
+    def observe(self, stage, seconds, error):
+        # Failed stages are judged in slot(), once it's known whether the
+        # error ended the job or was handled.
+        if error is not None or stage in ADAPTIVE_IGNORE_STAGES:
+            return
+        with self._cond:
+            avg, count = self._latency.get(stage, (seconds, 0))
+            self._latency[stage] = (avg * 0.8 + seconds * 0.2 if count else seconds, count + 1)
+        if count >= 5 and seconds > ADAPTIVE_SLOW_FACTOR * avg:
+            _active.congested = True
+            self._decrease(f"{stage} took {seconds:.1f}s vs {avg:.1f}s usual")
+
+
+def _on_stage(stage, seconds, error):
+    # Order-specific failures (unknown SKU, bad address) say nothing about
+    # the storefront and are left out of the breaker window.
+    if stage in BREAKER_STAGES and (error is None or is_storefront_error(error)):
+        get_breaker(stage).record(error is None)
+    limiter = getattr(_active, "limiter", None)
+    if limiter is not None:
+        limiter.observe(stage, seconds, error)
+
+
+add_stage_listener(_on_stage)
+
+placement_limiter = AdaptiveLimiter("placement", breaker_stages=("login", "checkout"))
+tracking_limiter = AdaptiveLimiter("tracking", breaker_stages=("login",))
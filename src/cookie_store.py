@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+
+from utils import STORE_URL
+from waits import navigate
+
+COOKIE_STORE_BACKEND = os.getenv("COOKIE_STORE_BACKEND", "file")
+COOKIE_STORE_PATH = os.getenv(
+    "COOKIE_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".session_cookies.json"),
+)
+# Landing page used to put the driver on the storefront domain before
+# cookies can be injected. Kept as small as possible.
+COOKIE_LANDING_URL = f"{STORE_URL}/robots.txt"
+
+
+class MemoryCookieStore:
+    """Keeps cookies for the lifetime of the process only."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def load(self, account):
+        with self._lock:
+            entry = self._data.get(account)
+        return entry["cookies"] if entry else None
+
+    def save(self, account, cookies):
+        with self._lock:
+            self._data[account] = {"saved": time.time(), "cookies": cookies}
+
+    def clear(self, account):
+        with self._lock:
+            self._data.pop(account, None)
+
+
+class FileCookieStore(MemoryCookieStore):
+    """JSON file keyed by account, shared by every process on the host."""
+
+    def __init__(self, path=COOKIE_STORE_PATH):
+        super().__init__()
+        self.path = path
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, data):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def load(self, account):
+        with self._lock:
+            entry = self._read().get(account)
+        return entry["cookies"] if entry else None
+
+    def save(self, account, cookies):
+        with self._lock:
+            data = self._read()
+            data[account] = {"saved": time.time(), "cookies": cookies}
+            self._write(data)
+
+    def clear(self, account):
+        with self._lock:
+            data = self._read()
+            if data.pop(account, None) is not None:
+                self._write(data)
+
+
+COOKIE_STORE_BACKENDS = {
+    "file": FileCookieStore,
+    "memory": MemoryCookieStore,
+}
+
+_default_store = None
+
+
+def get_cookie_store():
+    global _default_store
+    if _default_store is None:
+        backend = COOKIE_STORE_BACKENDS.get(COOKIE_STORE_BACKEND)
+        if backend is None:
+            raise Exception(f"Unknown COOKIE_STORE_BACKEND: {COOKIE_STORE_BACKEND}")
+        _default_store = backend()
+    return _default_store
+
+
+def is_logged_in(driver, timeout=10):
+    """Cheap logged-in probe via Magento's customer-data section endpoint."""
+    try:
+        driver.set_script_timeout(timeout)
+        return bool(
+            driver.execute_async_script(
+                """
+                const done = arguments[arguments.length - 1];
+                fetch(arguments[0], {
+                    credentials: 'include',
+                    headers: {'X-Requested-With': 'XMLHttpRequest'}
+                })
+                    .then(r => r.ok ? r.json() : {})
+                    .then(j => done(!!(j.customer && j.customer.firstname)))
+                    .catch(() => done(false));
+                """,
+                f"{STORE_URL}/customer/section/load/?sections=customer",
+            )
+        )
+    except Exception:
+        return False
+
+
+def save_session(driver, account, store=None):
+    store = store or get_cookie_store()
+    try:
+        store.save(account, driver.get_cookies())
+        print("🍪 Session cookies saved")
+    except Exception as e:
+        print("⚠️ Could not save session cookies:", repr(e))
+
+
+def restore_session(driver, account, store=None):
+    """Inject saved cookies into a fresh driver and verify the session.
+
+    Returns True when the restored session is logged in. Stale cookies are
+    dropped from the store so the next caller goes straight to the form.
+    """
+    store = store or get_cookie_store()
+    cookies = store.load(account)
+    if not cookies:
+        return False
+
+    navigate(driver, COOKIE_LANDING_URL, "document")
+    now = time.time()
+    for cookie in cookies:
+        if cookie.get("expiry") and cookie["expiry"] < now:
+            continue
+        cookie = {k: v for k, v in cookie.items() if k != "sameSite" or v in ("Strict", "Lax", "None")}
+        try:
+            driver.add_cookie(cookie)
+        except Exception:
+            pass
+
+    if is_logged_in(driver):
+        print("🍪 Session restored from saved cookies")
+        return True
+
+    print("🍪 Saved cookies expired, falling back to form login")
+    store.clear(account)
+    driver.delete_all_cookies()
+    return False
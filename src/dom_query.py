@@ -0,0 +1,96 @@
+# Batched DOM lookups: one execute_script round trip instead of one per
+# element and property. Selectors starting with "/", "./" or "(" are XPath,
+# everything else CSS. DOM nodes come back as WebElements.
+
+_HELPERS_JS = """
+const isXPath = s => s.startsWith('/') || s.startsWith('./') || s.startsWith('(');
+const findAll = (root, s) => {
+    if (!isXPath(s)) return Array.from(root.querySelectorAll(s));
+    const res = document.evaluate(s, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const out = [];
+    for (let i = 0; i < res.snapshotLength; i++) out.push(res.snapshotItem(i));
+    return out;
+};
+const visible = el => !!(el.offsetParent !== null || el.getClientRects().length);
+const firstVisible = (root, selectors) => {
+    for (const s of selectors) {
+        const el = findAll(root, s).find(visible);
+        if (el) return el;
+    }
+    return null;
+};
+const prop = (el, name) => {
+    if (name === 'text') return (el.innerText || '').trim();
+    if (name === 'value') return el.value;
+    if (name === 'visible') return visible(el);
+    if (name === 'href') return el.href || el.getAttribute('href');
+    return el.getAttribute(name);
+};
+"""
+
+FIRST_VISIBLE_JS = _HELPERS_JS + """
+return firstVisible(arguments[1] || document, arguments[0]);
+"""
+
+QUERY_ALL_JS = _HELPERS_JS + """
+const [selector, props, root] = arguments;
+return findAll(root || document, selector).map(el => {
+    const row = {element: el};
+    props.forEach(p => { row[p] = prop(el, p); });
+    return row;
+});
+"""
+
+# Sets every field in one pass; fields are [key, selectors, value] triples
+# and each value goes to the first visible match. Returns the keys filled.
+FILL_FIELDS_JS = _HELPERS_JS + """
+const [fields, root] = arguments;
+const filled = [];
+for (const [key, selectors, value] of fields) {
+    const el = firstVisible(root || document, selectors);
+    if (!el) continue;
+    el.focus();
+    el.value = value;
+    ['input', 'change', 'blur'].forEach(t => el.dispatchEvent(new Event(t, {bubbles: true})));
+    filled.push(key);
+}
+return filled;
+"""
+
+SELECT_OPTION_JS = """
+const [select, needles] = arguments;
+const option = Array.from(select.options).find(o => {
+    const text = (o.text || '').toLowerCase();
+    return needles.every(n => text.includes(n));
+});
+if (!option) return null;
+select.value = option.value;
+select.dispatchEvent(new Event('change', {bubbles: true}));
+return option.text;
+"""
+
+
+def first_visible(driver, selectors, root=None):
+    """First displayed element matching any of `selectors`, tried in order."""
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    return driver.execute_script(FIRST_VISIBLE_JS, list(selectors), root)
+
+
+def query_all(driver, selector, props=("text",), root=None):
+    """Every match of `selector` as a dict of `element` plus the requested props.
+
+    Props are "text", "value", "visible", "href" or any attribute name.
+    """
+    return driver.execute_script(QUERY_ALL_JS, selector, list(props), root) or []
+
+
+def fill_fields(driver, fields, root=None):
+    """Fill inputs/selects from {key: (selectors, value)}; returns the keys set."""
+    payload = [[key, list(selectors), value] for key, (selectors, value) in fields.items()]
+    return driver.execute_script(FILL_FIELDS_JS, payload, root) or []
+
+
+def select_option_containing(driver, select_el, needles):
+    """Select the first option whose text contains all `needles` (case-insensitive)."""
+    return driver.execute_script(SELECT_OPTION_JS, select_el, [n.lower() for n in needles])
@@ -0,0 +1,94 @@
+import itertools
+import os
+import threading
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from resource_blocking import apply_blocking_options, apply_blocking_to_driver
+
+# "grid" (Selenium Grid / standalone), "local" (chromedriver on this host)
+# or "cdp" (attach to an already running Chrome with remote debugging).
+DRIVER_BACKEND = os.getenv("DRIVER_BACKEND", "grid")
+# Comma separated; new sessions are spread round-robin over the nodes.
+SELENIUM_GRID_URLS = [
+    u.strip()
+    for u in os.getenv("SELENIUM_GRID_URLS", "http://localhost:4444/wd/hub").split(",")
+    if u.strip()
+]
+DRIVER_CDP_ADDRESS = os.getenv("DRIVER_CDP_ADDRESS", "127.0.0.1:9222")
+DRIVER_HEADLESS = os.getenv("DRIVER_HEADLESS", "1") != "0"
+DRIVER_WINDOW_SIZE = os.getenv("DRIVER_WINDOW_SIZE", "1366,900")
+# "eager" or "none" return from driver.get() before third-party scripts
+# finish; every navigation waits on its own readiness predicate instead
+# (see waits.navigate).
+DRIVER_PAGE_LOAD_STRATEGY = os.getenv("DRIVER_PAGE_LOAD_STRATEGY", "eager")
+
+_grid_nodes = itertools.cycle(range(len(SELENIUM_GRID_URLS)))
+_grid_lock = threading.Lock()
+
+
+def build_options(
+    headless=DRIVER_HEADLESS,
+    page_load_strategy=DRIVER_PAGE_LOAD_STRATEGY,
+    performance_log=False,
+):
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument(f"--window-size={DRIVER_WINDOW_SIZE}")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--no-first-run")
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.page_load_strategy = page_load_strategy
+    # browser: failure artifacts; performance: per-order resource report
+    logging_prefs = {"browser": "ALL"}
+    if performance_log:
+        logging_prefs["performance"] = "ALL"
+    options.set_capability("goog:loggingPrefs", logging_prefs)
+    apply_blocking_options(options)
+    return options
+
+
+def _next_grid_urls():
+    """All grid URLs, starting from the next node in the rotation."""
+    with _grid_lock:
+        first = next(_grid_nodes)
+    return SELENIUM_GRID_URLS[first:] + SELENIUM_GRID_URLS[:first]
+
+
+def _remote_driver(options):
+    last_error = None
+    for url in _next_grid_urls():
+        try:
+            return webdriver.Remote(command_executor=url, options=options)
+        except Exception as e:
+            print(f"⚠️ Grid node {url} refused session:", repr(e))
+            last_error = e
+    raise Exception(f"No Selenium Grid node available: {last_error!r}")
+
+
+def create_driver(backend=DRIVER_BACKEND, headless=DRIVER_HEADLESS, performance_log=False):
+    """New WebDriver for the configured backend with the performance profile applied.
+
+    `performance_log` turns on Chrome's performance log for resource_report.
+    """
+    if backend == "grid":
+        driver = _remote_driver(build_options(headless, performance_log=performance_log))
+    elif backend == "local":
+        driver = webdriver.Chrome(options=build_options(headless, performance_log=performance_log))
+    elif backend == "cdp":
+        # Chrome was started elsewhere; only the debugger address and the
+        # page-load strategy apply to an attached browser.
+        options = Options()
+        options.debugger_address = DRIVER_CDP_ADDRESS
+        options.page_load_strategy = DRIVER_PAGE_LOAD_STRATEGY
+        driver = webdriver.Chrome(options=options)
+    else:
+        raise Exception(f"Unknown DRIVER_BACKEND: {backend}")
+
+    apply_blocking_to_driver(driver)
+    return driver
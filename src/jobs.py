@@ -0,0 +1,236 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from leases import LEASE_TTL, get_lease_manager
+
+JOBS_DB_PATH = os.getenv(
+    "JOBS_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".jobs.sqlite3"),
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# How often orphaned jobs are looked for again. A job whose dead process
+# still held an unexpired lease at the previous pass is picked up once
+# that lease has run out.
+JOB_RECOVER_INTERVAL = float(os.getenv("JOB_RECOVER_INTERVAL", str(LEASE_TTL)))
+
+ACTIVE_STATUSES = ("queued", "running")
+# Once a job has reached one of these steps the order may already exist at
+# the supplier, so it must never be re-run automatically.
+UNSAFE_TO_RETRY_STEPS = ("submitting", "submitted", "sync")
+
+
+class JobStore:
+    """Durable job records in sqlite, one row per job."""
+
+    def __init__(self, path=JOBS_DB_PATH):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, order_id TEXT NOT NULL, status TEXT NOT NULL,"
+            " steps TEXT NOT NULL, supplier_order_number TEXT, error TEXT,"
+            " created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_order_id ON jobs (order_id)")
+        # Process that runs the job; added after the first release.
+        try:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN node TEXT")
+        except sqlite3.OperationalError:
+            pass
+        self._db.commit()
+
+    def _row(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["steps"] = json.loads(job["steps"])
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row)
+
+    def latest_for_order(self, order_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE order_id = ? ORDER BY created DESC LIMIT 1",
+                (order_id,),
+            ).fetchone()
+        return self._row(row)
+
+    def by_status(self, *statuses):
+        marks = ",".join("?" * len(statuses))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM jobs WHERE status IN ({marks}) ORDER BY created", statuses
+            ).fetchall()
+        return [self._row(r) for r in rows]
+
+    def create(self, order_id, node=None):
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, order_id, status, steps, created, updated, node)"
+                " VALUES (?, ?, 'queued', '[]', ?, ?, ?)",
+                (job_id, order_id, now, now, node),
+            )
+            self._db.commit()
+        return self.get(job_id)
+
+    def take_over(self, job_id, old_node, node):
+        """Move a job to `node`; False if another process took it first."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET node = ?, status = 'queued', steps = '[]', updated = ?"
+                " WHERE id = ? AND node IS ?",
+                (node, time.time(), job_id, old_node),
+            )
+            self._db.commit()
+        return cur.rowcount == 1
+
+    def update(self, job_id, **fields):
+        fields["updated"] = time.time()
+        if "steps" in fields:
+            fields["steps"] = json.dumps(fields["steps"])
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+            self._db.commit()
+
+    def add_step(self, job_id, step):
+        job = self.get(job_id)
+        steps = job["steps"] + [{"step": step, "at": time.time()}]
+        self.update(job_id, steps=steps)
+
+
+class JobQueue:
+    """Runs `run(order_id, progress)` on a bounded worker pool.
+
+    Submissions for an order that already has a queued, running,
+    succeeded or unknown job return that job instead of placing the order
+    twice.
+    """
+
+    def __init__(self, run, store=None, workers=JOB_WORKERS):
+        self.run = run
+        self.store = store or JobStore()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._submit_lock = threading.Lock()
+        # Held for the life of the process; sibling workers sharing the
+        # job database use it to tell live jobs from orphaned ones. The
+        # suffix keeps a restarted container that got the same pid from
+        # mistaking its predecessor's jobs for its own.
+        self.node = f"{get_lease_manager().node}:{uuid.uuid4().hex[:8]}"
+        self._node_lease = get_lease_manager().try_acquire(f"node:{self.node}")
+        self._stopped = threading.Event()
+        self._recover_thread = None
+
+    def submit(self, order_id, on_create=None):
+        """Queue the order; `on_create()` runs only when a new job was made."""
+        order_id = str(order_id)
+        with self._submit_lock:
+            existing = self.store.latest_for_order(order_id)
+            if existing and existing["status"] in ACTIVE_STATUSES + ("succeeded", "unknown"):
+                return existing
+            job = self.store.create(order_id, self.node)
+        if on_create is not None:
+            on_create()
+        self._executor.submit(self._run_job, job["id"], order_id)
+        return job
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def release_unknown(self, order_id):
+        """Allow resubmitting an order whose outcome was checked by hand."""
+        job = self.store.latest_for_order(str(order_id))
+        if job and job["status"] == "unknown":
+            self.store.update(job["id"], status="failed", error="Checked and cleared by hand")
+
+    def _run_job(self, job_id, order_id):
+        self.store.update(job_id, status="running")
+        try:
+            supplier_no = self.run(order_id, lambda step: self.store.add_step(job_id, step))
+        except Exception as e:
+            job = self.store.get(job_id)
+            if self._submitted(job):
+                # The order may exist at the supplier; a plain "failed"
+                # would let submit() place it again.
+                self.store.update(
+                    job_id,
+                    status="unknown",
+                    error=f"Failed after submission ({e!r}); check the supplier before retrying",
+                )
+            else:
+                self.store.update(job_id, status="failed", error=repr(e))
+            return
+        if supplier_no:
+            self.store.update(job_id, status="succeeded", supplier_order_number=supplier_no)
+        else:
+            self.store.update(job_id, status="failed", error="No supplier order number")
+
+    @staticmethod
+    def _submitted(job):
+        reached = {s["step"] for s in job["steps"]}
+        return bool(reached.intersection(UNSAFE_TO_RETRY_STEPS))
+
+    def recover(self):
+        """Re-queue jobs left behind by a previous process.
+
+        Jobs of processes that are still alive (their node lease is held)
+        or whose order is being placed right now are left alone; a dead
+        process's leases run out after LEASE_TTL, so start_recovery() runs
+        this again until they do. Jobs that died after the order was
+        submitted are marked `unknown` so someone checks the supplier
+        before placing them again.
+        """
+        leases = get_lease_manager()
+        for job in self.store.by_status(*ACTIVE_STATUSES):
+            if job["node"] == self.node:
+                continue
+            if job["node"] and leases.holder(f"node:{job['node']}"):
+                continue
+            if leases.holder(f"order:{job['order_id']}"):
+                continue
+            if self._submitted(job):
+                self.store.update(
+                    job["id"],
+                    status="unknown",
+                    error="Interrupted after submission; check the supplier before retrying",
+                )
+                continue
+            if not self.store.take_over(job["id"], job["node"], self.node):
+                continue
+            print(f"♻️ Re-queuing job {job['id']} for order {job['order_id']}")
+            self._executor.submit(self._run_job, job["id"], job["order_id"])
+
+    def start_recovery(self, interval=JOB_RECOVER_INTERVAL):
+        """Run recover() now and then every `interval` seconds until shutdown."""
+        if self._recover_thread is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.recover()
+                except Exception as e:
+                    print("⚠️ Job recovery failed:", repr(e))
+                if self._stopped.wait(interval):
+                    return
+
+        self._recover_thread = threading.Thread(target=loop, name="job-recovery", daemon=True)
+        self._recover_thread.start()
+
+    def shutdown(self):
+        self._stopped.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._node_lease is not None:
+            self._node_lease.release()
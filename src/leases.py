@@ -0,0 +1,360 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+import uuid
+from contextlib import contextmanager
+
+# "sqlite" coordinates the processes of one host through a shared file;
+# "redis" coordinates several hosts through any Redis-compatible server.
+LEASE_BACKEND = os.getenv("LEASE_BACKEND", "sqlite")
+LEASE_DB_PATH = os.getenv(
+    "LEASE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".leases.sqlite3"),
+)
+LEASE_REDIS_URL = os.getenv("LEASE_REDIS_URL", "redis://127.0.0.1:6379/0")
+LEASE_KEY_PREFIX = os.getenv("LEASE_KEY_PREFIX", "supplier:")
+# A crashed worker's lease is free again after LEASE_TTL seconds; live
+# workers renew theirs every LEASE_HEARTBEAT seconds.
+LEASE_TTL = float(os.getenv("LEASE_TTL", "60"))
+LEASE_HEARTBEAT = float(os.getenv("LEASE_HEARTBEAT", str(LEASE_TTL / 3)))
+LEASE_POLL_SECONDS = float(os.getenv("LEASE_POLL_SECONDS", "0.5"))
+
+# Compare-and-set scripts, so a worker whose lease expired and was taken
+# over cannot renew or delete the new owner's lease.
+RENEW_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+)
+RELEASE_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('del', KEYS[1]) else return 0 end"
+)
+
+
+class LeaseBusyError(Exception):
+    pass
+
+
+class LeaseLostError(Exception):
+    pass
+
+
+class RedisError(Exception):
+    pass
+
+
+# =====================================================
+# BACKENDS
+# =====================================================
+# acquire(key, owner, ttl) -> bool; ttl=None never expires
+# renew(key, owner, ttl) -> bool
+# release(key, owner) -> bool; owner=None deletes whoever holds it
+# holder(key) -> owner or None
+
+
+class SqliteLeaseBackend:
+    """Leases in a sqlite file shared by every process on the host."""
+
+    def __init__(self, path=LEASE_DB_PATH):
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL)"
+        )
+
+    def acquire(self, key, owner, ttl):
+        now = time.time()
+        expires = None if ttl is None else now + ttl
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so the check and the
+            # insert are atomic across processes.
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "DELETE FROM leases WHERE key = ? AND expires IS NOT NULL AND expires < ?",
+                    (key, now),
+                )
+                self._db.execute(
+                    "INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                    (key, owner, expires),
+                )
+                row = self._db.execute("SELECT owner FROM leases WHERE key = ?", (key,)).fetchone()
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return row is not None and row[0] == owner
+
+    def renew(self, key, owner, ttl):
+        now = time.time()
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE leases SET expires = ? WHERE key = ? AND owner = ?"
+                " AND (expires IS NULL OR expires >= ?)",
+                (now + ttl, key, owner, now),
+            )
+        return cur.rowcount == 1
+
+    def release(self, key, owner=None):
+        with self._lock:
+            if owner is None:
+                cur = self._db.execute("DELETE FROM leases WHERE key = ?", (key,))
+            else:
+                cur = self._db.execute(
+                    "DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner)
+                )
+        return cur.rowcount == 1
+
+    def holder(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT owner FROM leases WHERE key = ? AND (expires IS NULL OR expires >= ?)",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+
+class _RespConnection:
+    """Minimal RESP2 client over a plain socket; one per thread."""
+
+    def __init__(self, host, port, db=0, password=None, timeout=5):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._file = self._sock.makefile("rb")
+        if password:
+            self.command("AUTH", password)
+        if db:
+            self.command("SELECT", db)
+
+    def command(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._sock.sendall(b"".join(parts))
+        return self._read()
+
+    def _read(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            data = self._file.read(size + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._read() for _ in range(size)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def close(self):
+        try:
+            self._file.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+
+class RedisLeaseBackend:
+    """Leases as Redis keys: SET NX PX to take, compare-and-set to renew or drop."""
+
+    def __init__(self, url=LEASE_REDIS_URL):
+        parsed = urllib.parse.urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.strip("/") or 0)
+        self.password = parsed.password
+        self._local = threading.local()
+
+    def _command(self, *args):
+        # One reconnect covers a server restart or an idle connection dropped
+        # by a proxy; a second failure is the caller's problem.
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = _RespConnection(
+                    self.host, self.port, self.db, self.password
+                )
+            try:
+                return conn.command(*args)
+            except (OSError, ConnectionError):
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+    def acquire(self, key, owner, ttl):
+        args = ["SET", key, owner, "NX"]
+        if ttl is not None:
+            args += ["PX", int(ttl * 1000)]
+        if self._command(*args) == "OK":
+            return True
+        return self._command("GET", key) == owner
+
+    def renew(self, key, owner, ttl):
+        return self._command("EVAL", RENEW_SCRIPT, 1, key, owner, int(ttl * 1000)) == 1
+
+    def release(self, key, owner=None):
+        if owner is None:
+            return self._command("DEL", key) == 1
+        return self._command("EVAL", RELEASE_SCRIPT, 1, key, owner) == 1
+
+    def holder(self, key):
+        return self._command("GET", key)
+
+
+LEASE_BACKENDS = {
+    "sqlite": SqliteLeaseBackend,
+    "redis": RedisLeaseBackend,
+}
+
+
+# =====================================================
+# LEASES
+# =====================================================
+
+class Lease:
+    def __init__(self, manager, key, owner, ttl):
+        self.manager = manager
+        self.key = key
+        self.owner = owner
+        self.ttl = ttl
+        self.renewed = time.monotonic()
+        self.lost = False
+
+    def check(self):
+        """Raise if a missed heartbeat let another worker take the lease."""
+        if self.lost:
+            raise LeaseLostError(f"Lease on {self.key} expired and may be held elsewhere")
+
+    def release(self):
+        self.manager.release(self)
+
+
+class LeaseManager:
+    """Expiring, heartbeated leases on top of a backend.
+
+    A single daemon thread renews every lease this process holds, so a
+    worker that crashes or hangs loses its leases after `ttl` seconds
+    while a live one keeps them as long as it needs.
+    """
+
+    def __init__(self, backend, ttl=LEASE_TTL, heartbeat=LEASE_HEARTBEAT, prefix=LEASE_KEY_PREFIX):
+        self.backend = backend
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.prefix = prefix
+        self.node = f"{socket.gethostname()}:{os.getpid()}"
+        self._held = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _key(self, name):
+        return f"{self.prefix}{name}"
+
+    def try_acquire(self, name, ttl=None):
+        """Take the lease now or return None."""
+        ttl = ttl or self.ttl
+        owner = f"{self.node}:{uuid.uuid4().hex[:12]}"
+        key = self._key(name)
+        if not self.backend.acquire(key, owner, ttl):
+            return None
+        lease = Lease(self, key, owner, ttl)
+        with self._lock:
+            self._held[(key, owner)] = lease
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._beat, name="lease-heartbeat", daemon=True)
+                self._thread.start()
+        return lease
+
+    def acquire(self, name, ttl=None, timeout=None):
+        """Wait up to `timeout` seconds (None: forever, 0: no wait) for the lease."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            lease = self.try_acquire(name, ttl)
+            if lease is not None:
+                return lease
+            if deadline is not None and time.monotonic() >= deadline:
+                raise LeaseBusyError(f"{name} is held by {self.holder(name) or 'another worker'}")
+            time.sleep(LEASE_POLL_SECONDS)
+
+    def release(self, lease):
+        with self._lock:
+            self._held.pop((lease.key, lease.owner), None)
+        try:
+            self.backend.release(lease.key, lease.owner)
+        except Exception as e:
+            # Expiry frees it anyway
+            print(f"⚠️ Could not release lease {lease.key}:", repr(e))
+
+    @contextmanager
+    def hold(self, name, ttl=None, timeout=None):
+        lease = self.acquire(name, ttl, timeout)
+        try:
+            yield lease
+        finally:
+            lease.release()
+
+    def holder(self, name):
+        return self.backend.holder(self._key(name))
+
+    def claim(self, name):
+        """Permanent first-writer-wins marker; False if already claimed."""
+        return self.backend.acquire(self._key(name), f"{self.node}:{uuid.uuid4().hex[:12]}", None)
+
+    def unclaim(self, name):
+        self.backend.release(self._key(name))
+
+    def mark(self, name, value):
+        """Permanent marker set to `value`, replacing any previous one."""
+        key = self._key(name)
+        self.backend.release(key)
+        self.backend.acquire(key, str(value), None)
+
+    def _beat(self):
+        while True:
+            time.sleep(self.heartbeat)
+            with self._lock:
+                leases = list(self._held.values())
+            for lease in leases:
+                try:
+                    ok = self.backend.renew(lease.key, lease.owner, lease.ttl)
+                except Exception as e:
+                    # Keep trying until the lease would have expired anyway
+                    print(f"⚠️ Lease heartbeat for {lease.key} failed:", repr(e))
+                    ok = time.monotonic() - lease.renewed < lease.ttl
+                else:
+                    if ok:
+                        lease.renewed = time.monotonic()
+                if not ok:
+                    lease.lost = True
+                    with self._lock:
+                        self._held.pop((lease.key, lease.owner), None)
+                    print(f"🚨 Lost lease {lease.key}")
+
+
+_default_manager = None
+_default_lock = threading.Lock()
+
+
+def get_lease_manager():
+    global _default_manager
+    with _default_lock:
+        if _default_manager is None:
+            backend = LEASE_BACKENDS.get(LEASE_BACKEND)
+            if backend is None:
+                raise Exception(f"Unknown LEASE_BACKEND: {LEASE_BACKEND}")
+            _default_manager = LeaseManager(backend())
+    return _default_manager
@@ -1,42 +1,43 @@
 import os
 import time
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from dotenv import load_dotenv
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.remote.webdriver import WebDriver
 import os
 import subprocess
+from artifacts import capture_failure
+from cookie_store import restore_session, save_session
+from dom_query import first_visible
+from driver_factory import create_driver
+from resource_blocking import RESOURCE_REPORT_ENABLED
+from waits import navigate
 
 load_dotenv()
 
 LOGIN_URL = os.getenv("SUPPLIER_LOGIN_URL")
 
 
-def login():
-    # options = webdriver.ChromeOptions()
-    # options.add_argument("--start-maximized")
-    # options.add_argument("--disable-blink-features=AutomationControlled")
-    # driver = webdriver.Chrome(options=options)
+def login(email=None, password=None):
+    """Logged-in driver for the given supplier account (default: SUPPLIER_EMAIL)."""
+    email_val = email or os.getenv("SUPPLIER_EMAIL")
+    password_val = password or os.getenv("SUPPLIER_PASSWORD")
 
-    options = Options()
-    options.add_argument("--headless=new")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--disable-blink-features=AutomationControlled")
+    if not email_val or not password_val:
+        raise Exception("SUPPLIER_EMAIL / SUPPLIER_PASSWORD missing")
 
-    driver = webdriver.Remote(
-        command_executor="http://localhost:4444/wd/hub",
-        options=options,
-    )
+    # Order sessions feed the per-order resource report
+    driver = create_driver(performance_log=RESOURCE_REPORT_ENABLED)
+
+    if restore_session(driver, email_val):
+        return driver
 
     wait = WebDriverWait(driver, 30)
 
-    driver.get(LOGIN_URL)
+    navigate(driver, LOGIN_URL, "login")
     try:
 
         cookie = wait.until(
@@ -59,19 +60,10 @@ def login():
     except Exception:
         pass
 
-    email_val = os.getenv("SUPPLIER_EMAIL")
-    password_val = os.getenv("SUPPLIER_PASSWORD")
-
-    if not email_val or not password_val:
-        raise Exception("SUPPLIER_EMAIL / SUPPLIER_PASSWORD missing")
     print("Waiting for email field...")
 
     def find_visible_element(xpath):
-        elements = driver.find_elements(By.XPATH, xpath)
-        for el in elements:
-            if el.is_displayed():
-                return el
-        return None
+        return first_visible(driver, xpath)
 
     wait.until(
         lambda d: find_visible_element("//input[@id='email' or @id='customer-email']")
@@ -118,8 +110,10 @@ def login():
     try:
         wait.until(lambda d: d.current_url != LOGIN_URL)
         print("LOGIN SUCCESS")
-    except TimeoutException:
+        save_session(driver, email_val)
+    except TimeoutException as e:
         print("LOGIN TIMEOUT - might have failed or stayed on the same page")
+        capture_failure(driver, "login", "login_submit", e)
         if "login" in driver.current_url:
 
             try:
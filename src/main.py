@@ -2,12 +2,38 @@ import sys
 from login import login
 from place_order import place_order
 
+def main_batch(order_ids, workers):
+    from batch import place_orders_batch
+
+    print(f"Processing {len(order_ids)} orders with {workers} workers")
+    results = place_orders_batch(order_ids, workers=workers)
+
+    failed = [r["orderId"] for r in results if not r["success"]]
+    for r in results:
+        if r["success"]:
+            print(f"SUPPLIER_ORDER_NUMBER:{r['orderId']}:{r['supplierOrderNumber']}")
+    for order_id in failed:
+        print(f"ORDER_FAILED:{order_id}")
+    sys.exit(1 if failed else 0)
+
+
 def main():
-    if len(sys.argv) < 2:
+    args = sys.argv[1:]
+    workers = None
+    if "--workers" in args:
+        i = args.index("--workers")
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+
+    if len(args) < 1:
         print("ORDER_FAILED")
         sys.exit(1)
 
-    order_id = sys.argv[1]
+    if len(args) > 1 or workers:
+        from batch import BATCH_WORKERS
+        main_batch(args, workers or BATCH_WORKERS)
+
+    order_id = args[0]
     print("Processing Order ID:", order_id)
 
     driver = None
@@ -34,4 +60,4 @@ def main():
             driver.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
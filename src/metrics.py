@@ -0,0 +1,325 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+TIMELINE_DIR = os.getenv(
+    "TIMELINE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".timelines"),
+)
+# Timelines older than this are deleted when a new one is written; 0 keeps all
+TIMELINE_RETENTION_DAYS = float(os.getenv("TIMELINE_RETENTION_DAYS", "30"))
+TIMELINE_PRUNE_INTERVAL = 3600
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+REGISTRY = []
+# Called as listener(stage, seconds, error) after every stage
+STAGE_LISTENERS = []
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_one(key, value))
+        return lines
+
+    def _render_one(self, key, value):
+        return [f"{self.name}{_labels(self.labels, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["counts"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def _render_one(self, key, value):
+        names = self.labels + ("le",)
+        lines = [
+            f"{self.name}_bucket{_labels(names, key + (bound,))} {count}"
+            for bound, count in zip(self.buckets, value["counts"])
+        ]
+        lines.append(f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {value['count']}")
+        lines.append(f"{self.name}_sum{_labels(self.labels, key)} {value['sum']}")
+        lines.append(f"{self.name}_count{_labels(self.labels, key)} {value['count']}")
+        return lines
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "checkout_stage_seconds",
+    "Duration of each checkout pipeline stage.",
+    labels=("stage", "outcome"),
+)
+WAIT_SECONDS = Histogram(
+    "webdriver_wait_seconds",
+    "Duration of each WebDriver wait.",
+    labels=("wait", "outcome"),
+)
+ORDERS_TOTAL = Counter(
+    "orders_placed_total",
+    "Orders processed by place_order.",
+    labels=("outcome",),
+)
+BROWSER_REQUESTS = Counter(
+    "browser_requests_total",
+    "Browser network requests per outcome (loaded or blocked).",
+    labels=("outcome",),
+)
+BROWSER_BYTES = Counter(
+    "browser_loaded_bytes_total",
+    "Bytes the browser actually transferred.",
+)
+
+
+# =====================================================
+# PER-ORDER TIMELINE
+# =====================================================
+
+_current = threading.local()
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+
+def start_timeline(order_id):
+    _current.timeline = {
+        "orderId": str(order_id),
+        "startedAt": time.time(),
+        "events": [],
+    }
+    _current.depth = 0
+    _current.failed_stage = None
+    _current.failed_error = None
+
+
+def _event(kind, name, started, seconds, outcome):
+    timeline = getattr(_current, "timeline", None)
+    if timeline is None:
+        return
+    timeline["events"].append(
+        {
+            "type": kind,
+            "name": name,
+            "depth": getattr(_current, "depth", 0),
+            "offset": round(started - timeline["startedAt"], 3),
+            "seconds": round(seconds, 3),
+            "outcome": outcome,
+        }
+    )
+
+
+def timeline_events(kind):
+    """Events of one type recorded so far in the current order's timeline."""
+    timeline = getattr(_current, "timeline", None)
+    if timeline is None:
+        return []
+    return [e for e in timeline["events"] if e["type"] == kind]
+
+
+def annotate(key, value):
+    """Attach extra data to the current order's timeline."""
+    timeline = getattr(_current, "timeline", None)
+    if timeline is not None:
+        timeline[key] = value
+
+
+def observe_resources(report):
+    BROWSER_REQUESTS.inc(report["loadedRequests"], outcome="loaded")
+    BROWSER_REQUESTS.inc(report["blockedRequests"], outcome="blocked")
+    BROWSER_BYTES.inc(report["loadedBytes"])
+    annotate("resources", report)
+
+
+def finish_timeline(outcome):
+    """Close the current order's timeline and write it to TIMELINE_DIR."""
+    timeline = getattr(_current, "timeline", None)
+    _current.timeline = None
+    if timeline is None:
+        return None
+    timeline["outcome"] = outcome
+    timeline["seconds"] = round(time.time() - timeline["startedAt"], 3)
+    ORDERS_TOTAL.inc(outcome=outcome)
+    try:
+        os.makedirs(TIMELINE_DIR, exist_ok=True)
+        path = os.path.join(
+            TIMELINE_DIR, f"{timeline['orderId']}-{int(timeline['startedAt'])}.json"
+        )
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(timeline, f, indent=2)
+    except OSError as e:
+        print("⚠️ Could not write timeline:", repr(e))
+    prune_timelines()
+    return timeline
+
+
+def prune_timelines(max_age_days=TIMELINE_RETENTION_DAYS):
+    """Delete timelines older than `max_age_days`; at most once an hour."""
+    global _last_prune
+    if max_age_days <= 0:
+        return
+    with _prune_lock:
+        if time.time() - _last_prune < TIMELINE_PRUNE_INTERVAL:
+            return
+        _last_prune = time.time()
+    cutoff = time.time() - max_age_days * 86400
+    try:
+        names = os.listdir(TIMELINE_DIR)
+    except OSError:
+        return
+    removed = 0
+    for name in names:
+        path = os.path.join(TIMELINE_DIR, name)
+        try:
+            if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    if removed:
+        print(f"🧹 Removed {removed} timeline(s) older than {max_age_days:g} days")
+
+
+def failed_stage(error=None):
+    """Name of the innermost stage that raised `error` (or what it wraps).
+
+    Without `error`, the stage of the most recent exception is returned.
+    Exceptions that a caller handled are not reported for a later one.
+    """
+    recorded = getattr(_current, "failed_error", None)
+    if error is None or recorded is None:
+        return getattr(_current, "failed_stage", None)
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if error is recorded:
+            return _current.failed_stage
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def latest_timeline(order_id):
+    prefix = f"{order_id}-"
+    try:
+        names = [n for n in os.listdir(TIMELINE_DIR) if n.startswith(prefix) and n.endswith(".json")]
+    except OSError:
+        return None
+    if not names:
+        return None
+    names.sort(key=lambda n: int(n[len(prefix):-5]) if n[len(prefix):-5].isdigit() else 0)
+    with open(os.path.join(TIMELINE_DIR, names[-1]), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage into the histogram and the order timeline."""
+    started = time.time()
+    start = time.monotonic()
+    _current.depth = getattr(_current, "depth", 0) + 1
+    outcome = "ok"
+    error = None
+    try:
+        yield
+    except Exception as e:
+        outcome = "error"
+        error = e
+        # Innermost stage wins; outer stages only see the same exception
+        # pass through. A new exception replaces one handled earlier.
+        if getattr(_current, "failed_error", None) is not e:
+            _current.failed_stage = name
+            _current.failed_error = e
+        raise
+    finally:
+        _current.depth -= 1
+        seconds = time.monotonic() - start
+        STAGE_SECONDS.observe(seconds, stage=name, outcome=outcome)
+        _event("stage", name, started, seconds, outcome)
+        for listener in STAGE_LISTENERS:
+            try:
+                listener(name, seconds, error)
+            except Exception as e:
+                print("⚠️ Stage listener failed:", repr(e))
+
+
+def add_stage_listener(listener):
+    STAGE_LISTENERS.append(listener)
+
+
+def timed_stage(func):
+    """Decorator form of `stage`, named after the function."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with stage(func.__name__.lstrip("_")):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def observe_wait(name, seconds, outcome):
+    WAIT_SECONDS.observe(seconds, wait=name, outcome=outcome)
+    _event("wait", name, time.time() - seconds, seconds, outcome)
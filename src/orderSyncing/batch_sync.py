@@ -0,0 +1,287 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend_client import get_backend_client
+from cart_http import http_session
+from check_order_tracking import (
+    ORDER_HISTORY_URL,
+    extract_tracking_id,
+    get_history_index,
+    send_tracking_ids,
+)
+from cookie_store import get_cookie_store
+from order_history import LOGIN_PATH, VOID_TAGS, HttpOrderHistoryIndex, SessionExpired
+from syncingLogin import login
+from utils import STORE_URL
+
+TRACKING_SYNC_WORKERS = int(os.getenv("TRACKING_SYNC_WORKERS", "4"))
+# "http" reads history and order pages with plain GETs on the cookies of
+# one login; "browser" crawls the history in Selenium as before.
+TRACKING_SYNC_MODE = os.getenv("TRACKING_SYNC_MODE", "http")
+TRACKING_USER_AGENT = os.getenv(
+    "TRACKING_USER_AGENT",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0 Safari/537.36",
+)
+OPEN_ORDERS_PATH = os.getenv(
+    "OPEN_ORDERS_PATH", "/v1/order-history/open-supplier-orders"
+)
+
+
+class _TrackingLinkParser(HTMLParser):
+    """Collects hrefs matching `.track-order .track-button a`."""
+
+    def __init__(self):
+        super().__init__()
+        self.hrefs = []
+        self._stack = []
+
+    def _inside(self, cls):
+        return any(cls in classes for _, classes in self._stack)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a" and self._inside("track-order") and self._inside("track-button"):
+            if attrs.get("href"):
+                self.hrefs.append(attrs["href"])
+        if tag not in VOID_TAGS:
+            self._stack.append((tag, (attrs.get("class") or "").split()))
+
+    def handle_endtag(self, tag):
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                del self._stack[i:]
+                break
+
+
+def parse_tracking_hrefs(html):
+    parser = _TrackingLinkParser()
+    parser.feed(html)
+    return parser.hrefs
+
+
+def fetch_tracking_ids(http, view_url):
+    res = http.get(view_url, timeout=20)
+    res.raise_for_status()
+    if LOGIN_PATH in res.url:
+        raise SessionExpired("Supplier session expired")
+    tracking_ids = set()
+    for href in parse_tracking_hrefs(res.text):
+        tracking_id = extract_tracking_id(href)
+        if tracking_id:
+            tracking_ids.add(tracking_id)
+    return tracking_ids
+
+
+def fetch_open_supplier_orders():
+    """Supplier order numbers the backend still waits on tracking for."""
+    body = get_backend_client().get_json(OPEN_ORDERS_PATH, timeout=30)
+    if isinstance(body, dict):
+        body = body.get("data") or body.get("orders") or []
+    return [
+        o["supplierOrderNumber"] if isinstance(o, dict) else str(o)
+        for o in body
+        if (o.get("supplierOrderNumber") if isinstance(o, dict) else o)
+    ]
+
+
+def _sync_one(http, supplier_order_number, row):
+    if not row or not row.get("viewUrl"):
+        return {
+            "supplierOrderNumber": supplier_order_number,
+            "trackingGenerated": False,
+            "reason": "Order not found in table",
+        }
+    try:
+        tracking_ids = fetch_tracking_ids(http, row["viewUrl"])
+        if not tracking_ids:
+            return {
+                "supplierOrderNumber": supplier_order_number,
+                "trackingGenerated": False,
+                "reason": "No tracking IDs found",
+            }
+        send_tracking_ids(supplier_order_number, tracking_ids)
+        return {
+            "supplierOrderNumber": supplier_order_number,
+            "trackingGenerated": True,
+            "trackingNumbers": list(tracking_ids),
+        }
+    except SessionExpired:
+        # The caller logs in again and retries; not a per-order failure
+        raise
+    except Exception as e:
+        return {
+            "supplierOrderNumber": supplier_order_number,
+            "trackingGenerated": False,
+            "reason": str(e),
+        }
+
+
+def sync_tracking_batch(driver, supplier_order_numbers, workers=TRACKING_SYNC_WORKERS, account=None):
+    """Check many supplier orders on one logged-in session.
+
+    The history is crawled once in the browser; order detail pages are then
+    fetched over HTTP with the browser's cookies, `workers` at a time.
+    Yields one result dict per order as soon as it is ready.
+    """
+    supplier_order_numbers = list(dict.fromkeys(str(n) for n in supplier_order_numbers))
+    index = get_history_index(account).crawl_all(driver)
+    yield from _sync_all(http_session(driver), index, supplier_order_numbers, workers)
+
+
+def _sync_all(http, index, supplier_order_numbers, workers, refresh=None):
+    """Yield _sync_one results; orders hit by an expired session are
+    retried once on refresh() if given."""
+    expired = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_sync_one, http, n, index.get(n)): n
+            for n in supplier_order_numbers
+        }
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except SessionExpired:
+                expired.append(futures[future])
+    if not expired:
+        return
+    if refresh is None:
+        for n in expired:
+            yield {
+                "supplierOrderNumber": n,
+                "trackingGenerated": False,
+                "reason": "Supplier session expired",
+            }
+        return
+    print(f"🍪 Supplier session expired, logging in again for {len(expired)} orders")
+    yield from _sync_all(refresh(), index, expired, workers)
+
+
+# =====================================================
+# BROWSERLESS MODE
+# =====================================================
+
+_http_sessions = {}
+_http_indexes = {}
+# Guards the dicts only; each account has its own lock for logging in
+_http_lock = threading.Lock()
+_account_locks = {}
+
+
+def _account_lock(account):
+    with _http_lock:
+        lock = _account_locks.get(account)
+        if lock is None:
+            lock = _account_locks[account] = threading.Lock()
+    return lock
+
+
+def _logged_in(http):
+    try:
+        res = http.get(
+            f"{STORE_URL}/customer/section/load/",
+            params={"sections": "customer"},
+            headers={"X-Requested-With": "XMLHttpRequest"},
+            timeout=20,
+        )
+        return res.ok and bool((res.json().get("customer") or {}).get("firstname"))
+    except (requests.RequestException, ValueError):
+        return False
+
+
+def _set_cookies(http, cookies):
+    http.cookies.clear()
+    for c in cookies:
+        http.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+
+
+def account_http_session(account=None, password=None, fresh=False):
+    """Pooled requests session carrying `account`'s storefront cookies.
+
+    Cookies come from the cookie store; a browser is only started to log
+    in when they are missing or expired, and quit straight after.
+    """
+    account = account or os.getenv("SUPPLIER_EMAIL", "")
+    with _account_lock(account):
+        http = _http_sessions.get(account)
+        if http is not None and not fresh:
+            return http
+        if http is None:
+            http = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=TRACKING_SYNC_WORKERS)
+            http.mount("https://", adapter)
+            http.mount("http://", adapter)
+            http.headers["User-Agent"] = TRACKING_USER_AGENT
+
+        cookies = None if fresh else get_cookie_store().load(account)
+        if fresh:
+            get_cookie_store().clear(account)
+        if cookies:
+            _set_cookies(http, cookies)
+        if not cookies or not _logged_in(http):
+            driver = login(account, password)
+            try:
+                http.headers["User-Agent"] = driver.execute_script("return navigator.userAgent;")
+                _set_cookies(http, driver.get_cookies())
+            finally:
+                driver.quit()
+        with _http_lock:
+            _http_sessions[account] = http
+        return http
+
+
+def get_http_history_index(account=None):
+    account = account or os.getenv("SUPPLIER_EMAIL", "")
+    with _http_lock:
+        index = _http_indexes.get(account)
+        if index is None:
+            index = _http_indexes[account] = HttpOrderHistoryIndex(ORDER_HISTORY_URL)
+    return index
+
+
+def _with_session(account, password, func):
+    """Run func(http), logging in again once if the session has expired."""
+    try:
+        return func(account_http_session(account, password))
+    except SessionExpired:
+        print("🍪 Supplier session expired, logging in again")
+        return func(account_http_session(account, password, fresh=True))
+
+
+def sync_tracking_batch_http(
+    supplier_order_numbers, workers=TRACKING_SYNC_WORKERS, account=None, password=None
+):
+    """sync_tracking_batch without a browser.
+
+    History and order pages are fetched with plain GETs on the cookies of
+    one login, `workers` detail pages at a time. An expired session means
+    one fresh login, after which the affected orders are retried.
+    """
+    supplier_order_numbers = list(dict.fromkeys(str(n) for n in supplier_order_numbers))
+    index = _with_session(account, password, get_http_history_index(account).crawl_all)
+    http = account_http_session(account, password)
+    yield from _sync_all(
+        http,
+        index,
+        supplier_order_numbers,
+        workers,
+        refresh=lambda: account_http_session(account, password, fresh=True),
+    )
+
+
+def check_order_tracking_http(supplier_order_number, account=None, password=None):
+    """check_order_tracking without a browser."""
+    index = get_http_history_index(account)
+    return _with_session(
+        account,
+        password,
+        lambda http: _sync_one(http, supplier_order_number, index.find(http, supplier_order_number)),
+    )
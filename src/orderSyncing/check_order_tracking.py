@@ -1,16 +1,35 @@
 import urllib.parse
 import os
-import time
-import requests
+import sys
+import threading
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-ORDER_HISTORY_URL = "https://www.cchobby.nl/sales/order/history/"
-BACKEND_URL = os.getenv("BACKEND_URL", "http://31.97.78.137:3005")
-# BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:3005")
+from backend_client import get_backend_client
+from dom_query import query_all
+from order_history import OrderHistoryIndex
+from utils import STORE_URL
+from waits import navigate
+
+ORDER_HISTORY_URL = f"{STORE_URL}/sales/order/history/"
+
+# One index per supplier account, shared across lookups so checking many
+# orders costs one history crawl per account
+_history_indexes = {}
+_history_lock = threading.Lock()
+
+
+def get_history_index(account=None):
+    account = account or os.getenv("SUPPLIER_EMAIL", "")
+    with _history_lock:
+        index = _history_indexes.get(account)
+        if index is None:
+            index = _history_indexes[account] = OrderHistoryIndex(ORDER_HISTORY_URL)
+    return index
 
 # ✅ Extract tracking ID from different URL formats
 def extract_tracking_id(href):
@@ -35,55 +54,49 @@ def extract_tracking_id(href):
         return None
 
 
-# ✅ Main function
-def check_order_tracking(driver, supplier_order_number):
-    wait = WebDriverWait(driver, 20)
+# 🚀 Send all tracking IDs of an order in one request
+def send_tracking_ids(supplier_order_number, tracking_ids):
+    try:
+        for res in get_backend_client().save_tracking_ids(
+            supplier_order_number, tracking_ids
+        ):
+            print(f"📦 Sent tracking: {', '.join(sorted(tracking_ids))}")
+            print("📡 STATUS:", res.status_code)
+            print("📡 RESPONSE:", res.text)
 
-    driver.get(ORDER_HISTORY_URL)
+    except Exception as e:
+        print(f"❌ FAILED for {supplier_order_number}:", repr(e))
 
-    found = False
 
-    rows = wait.until(
-        EC.presence_of_all_elements_located((By.CSS_SELECTOR, "table tbody tr"))
-    )
+# ✅ Main function
+def check_order_tracking(driver, supplier_order_number, account=None):
+    wait = WebDriverWait(driver, 20)
 
     # 🔍 Find correct order
-    for row in rows:
-        try:
-            order_cell = row.find_element(By.CSS_SELECTOR, "td.col.id")
-            order_number = order_cell.text.strip()
+    row = get_history_index(account).find(driver, supplier_order_number)
 
-            if supplier_order_number == order_number:
-                view_btn = row.find_element(By.CSS_SELECTOR, "a.action.view")
-                driver.execute_script("arguments[0].click();", view_btn)
-                found = True
-                break
-
-        except Exception:
-            continue
-
-    if not found:
+    if not row or not row.get("viewUrl"):
         return {
             "supplierOrderNumber": supplier_order_number,
             "trackingGenerated": False,
             "reason": "Order not found in table",
         }
 
+    navigate(driver, row["viewUrl"], "order_view", timeout=20)
+
     # ⏳ Wait for tracking section
     wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".track-order")))
 
     try:
         # ✅ Get ALL tracking buttons
         buttons = wait.until(
-            EC.presence_of_all_elements_located(
-                (By.CSS_SELECTOR, ".track-order .track-button a")
-            )
+            lambda d: query_all(d, ".track-order .track-button a", ("href",))
         )
 
         tracking_ids = set()  # ✅ avoid duplicates
 
         for btn in buttons:
-            href = btn.get_attribute("href")
+            href = btn["href"]
 
             if not href:
                 continue
@@ -102,28 +115,7 @@ def check_order_tracking(driver, supplier_order_number):
                 "reason": "No tracking IDs found",
             }
 
-        # 🚀 Send each tracking ID separately
-        for tracking_id in tracking_ids:
-            try:
-                res = requests.post(
-                    f"{BACKEND_URL}/v1/order-history/save-tracking-id",
-                    json={
-                        "supplierOrderNumber": supplier_order_number,
-                        "trackingNumber": tracking_id,
-                    },
-                    headers={"Content-Type": "application/json"},
-                    timeout=15,
-                )
-
-                print(f"📦 Sent tracking: {tracking_id}")
-                print("📡 STATUS:", res.status_code)
-                print("📡 RESPONSE:", res.text)
-
-            except Exception as e:
-                print(f"❌ FAILED for {tracking_id}:", repr(e))
-
-            # ⚠️ prevent rate limit
-            time.sleep(0.5)
+        send_tracking_ids(supplier_order_number, tracking_ids)
 
         return {
             "supplierOrderNumber": supplier_order_number,
@@ -2,31 +2,79 @@ import sys
 from syncingLogin import login
 from check_order_tracking import check_order_tracking
 from selenium.webdriver.support.ui import WebDriverWait
-import time
 import json
 
+def main_batch(args):
+    from batch_sync import (
+        TRACKING_SYNC_MODE,
+        fetch_open_supplier_orders,
+        sync_tracking_batch,
+        sync_tracking_batch_http,
+    )
+
+    driver = None
+    ready = 0
+    try:
+        numbers = fetch_open_supplier_orders() if args == ["--all"] else args
+        print(f"Processing {len(numbers)} Supplier Order Numbers")
+
+        if TRACKING_SYNC_MODE == "http":
+            results = sync_tracking_batch_http(numbers)
+        else:
+            driver = login()
+            WebDriverWait(driver, 20).until(
+                lambda d: "login" not in d.current_url.lower()
+            )
+            results = sync_tracking_batch(driver, numbers)
+
+        for result in results:
+            print("JSON_RESULT:" + json.dumps(result), flush=True)
+            if result.get("trackingGenerated"):
+                ready += 1
+
+        print(f"TRACKING_READY_COUNT:{ready}/{len(numbers)}")
+        sys.exit(0)
+
+    except Exception as e:
+        print("MAIN ERROR:", e)
+        print("ORDER_Sync_FAILED")
+        sys.exit(1)
+
+    finally:
+        if driver:
+            print("🧹 Closing browser...")
+            driver.quit()
+
+
 def main():
     if len(sys.argv) < 2:
         print("ORDER_Sync_FAILED")
         sys.exit(1)
 
+    if len(sys.argv) > 2 or sys.argv[1] == "--all":
+        main_batch(sys.argv[1:])
+
     supplier_order_number = sys.argv[1]
     print("Processing Supplier Order Number:", supplier_order_number)
 
     driver = None
 
     try:
-        driver = login()
-        time.sleep(3)
+        from batch_sync import TRACKING_SYNC_MODE, check_order_tracking_http
+
+        if TRACKING_SYNC_MODE == "http":
+            result = check_order_tracking_http(supplier_order_number)
+        else:
+            driver = login()
 
-        WebDriverWait(driver, 20).until(
-            lambda d: "login" not in d.current_url.lower()
-        )
+            WebDriverWait(driver, 20).until(
+                lambda d: "login" not in d.current_url.lower()
+            )
 
-        result = check_order_tracking(
-            driver,
-            supplier_order_number=supplier_order_number
-        )
+            result = check_order_tracking(
+                driver,
+                supplier_order_number=supplier_order_number
+            )
         print("JSON_RESULT:" + json.dumps(result))
         if result.get("trackingGenerated"):
             print(f"TRACKING_READY:{result.get('supplierOrderNumber')}")
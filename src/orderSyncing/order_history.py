@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+import urllib.parse
+from html.parser import HTMLParser
+
+from waits import navigate
+
+HISTORY_PAGE_LIMIT = int(os.getenv("HISTORY_PAGE_LIMIT", "50"))
+HISTORY_MAX_PAGES = int(os.getenv("HISTORY_MAX_PAGES", "40"))
+HISTORY_INDEX_TTL = int(os.getenv("HISTORY_INDEX_TTL", "600"))
+
+# Reads every row of the order history table and the pager's next link in
+# a single WebDriver round trip.
+HISTORY_ROWS_JS = """
+const rows = Array.from(document.querySelectorAll('table tbody tr')).map(tr => {
+    const cell = sel => {
+        const el = tr.querySelector(sel);
+        return el ? el.innerText.trim() : null;
+    };
+    const view = tr.querySelector('a.action.view');
+    return {
+        number: cell('td.col.id'),
+        date: cell('td.col.date'),
+        total: cell('td.col.total'),
+        status: cell('td.col.status'),
+        viewUrl: view ? view.href : null,
+    };
+}).filter(r => r.number);
+const next = document.querySelector('.pages-item-next a');
+return {rows: rows, next: next ? next.href : null};
+"""
+
+HISTORY_CELLS = ("id", "date", "total", "status")
+LOGIN_PATH = "customer/account/login"
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class SessionExpired(Exception):
+    pass
+
+
+class _HistoryTableParser(HTMLParser):
+    """Same rows and next link as HISTORY_ROWS_JS, from the raw page HTML."""
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url
+        self.rows = []
+        self.next = None
+        self._stack = []
+        self._row = None
+        self._cell = None
+        self._text = []
+
+    def _inside(self, tag=None, cls=None):
+        return any(
+            (tag is None or t == tag) and (cls is None or cls in classes)
+            for t, classes in self._stack
+        )
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        href = attrs.get("href")
+        if tag == "tr" and self._inside("table") and self._inside("tbody"):
+            self._row = {"number": None, "date": None, "total": None, "status": None, "viewUrl": None}
+        elif tag == "td" and self._row is not None and "col" in classes:
+            cell = next((c for c in HISTORY_CELLS if c in classes), None)
+            if cell:
+                self._cell = "number" if cell == "id" else cell
+                self._text = []
+        elif tag == "a" and href:
+            if self._row is not None and "action" in classes and "view" in classes:
+                self._row["viewUrl"] = urllib.parse.urljoin(self.base_url, href)
+            elif self._inside(cls="pages-item-next"):
+                self.next = urllib.parse.urljoin(self.base_url, href)
+        if tag not in VOID_TAGS:
+            self._stack.append((tag, classes))
+
+    def handle_data(self, data):
+        if self._cell:
+            self._text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "td" and self._cell:
+            self._row[self._cell] = " ".join("".join(self._text).split()) or None
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            if self._row["number"]:
+                self.rows.append(self._row)
+            self._row = None
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                del self._stack[i:]
+                break
+
+
+def parse_history_page(html, base_url):
+    parser = _HistoryTableParser(base_url)
+    parser.feed(html)
+    return {"rows": parser.rows, "next": parser.next}
+
+
+def with_limit(url, limit=HISTORY_PAGE_LIMIT):
+    parsed = urllib.parse.urlparse(url)
+    query = dict(urllib.parse.parse_qsl(parsed.query))
+    query["limit"] = str(limit)
+    return urllib.parse.urlunparse(parsed._replace(query=urllib.parse.urlencode(query)))
+
+
+class OrderHistoryIndex:
+    """Supplier order number -> history row (incl. view URL), cached.
+
+    Pages are crawled lazily: a lookup only walks as far as it needs to,
+    and the next lookup resumes where the previous one stopped. After
+    `ttl` seconds the index is rebuilt from the first page.
+    """
+
+    def __init__(self, history_url, ttl=HISTORY_INDEX_TTL):
+        self.history_url = history_url
+        self.ttl = ttl
+        self.orders = {}
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.orders.clear()
+        self._next_url = with_limit(self.history_url)
+        self._pages = 0
+        self._built_at = time.time()
+
+    def _fetch_page(self, driver, url):
+        navigate(driver, url, "history", timeout=20)
+        return driver.execute_script(HISTORY_ROWS_JS)
+
+    def _load_page(self, driver, url):
+        page = self._fetch_page(driver, url)
+        for row in page["rows"]:
+            self.orders.setdefault(row["number"], row)
+        self._pages += 1
+        if page["next"] and self._pages < HISTORY_MAX_PAGES:
+            self._next_url = with_limit(page["next"])
+        else:
+            self._next_url = None
+        print(f"📄 History page {self._pages}: {len(page['rows'])} orders indexed")
+
+    def _refresh_first_page(self, driver):
+        # New orders always appear on the first page.
+        next_url, pages = self._next_url, self._pages
+        self._load_page(driver, with_limit(self.history_url))
+        self._next_url, self._pages = next_url, pages
+
+    def find(self, driver, order_number):
+        with self._lock:
+            if time.time() - self._built_at > self.ttl:
+                self._reset()
+            if order_number in self.orders:
+                return self.orders[order_number]
+
+            if self._pages:
+                self._refresh_first_page(driver)
+            while order_number not in self.orders and self._next_url:
+                self._load_page(driver, self._next_url)
+            return self.orders.get(order_number)
+
+    def crawl_all(self, driver):
+        """Index every history page up front (for batch lookups)."""
+        with self._lock:
+            if time.time() - self._built_at > self.ttl:
+                self._reset()
+            while self._next_url:
+                self._load_page(driver, self._next_url)
+            return dict(self.orders)
+
+
+class HttpOrderHistoryIndex(OrderHistoryIndex):
+    """OrderHistoryIndex fed by plain GETs on a logged-in requests session.
+
+    Takes the session wherever the base class takes a driver.
+    """
+
+    def _fetch_page(self, http, url):
+        res = http.get(url, timeout=20)
+        res.raise_for_status()
+        if LOGIN_PATH in res.url:
+            raise SessionExpired("Supplier session expired")
+        return parse_history_page(res.text, res.url)
@@ -0,0 +1,91 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ORDER_CACHE_PATH = os.getenv(
+    "ORDER_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".order_cache.sqlite3"),
+)
+ORDER_CACHE_TTL = int(os.getenv("ORDER_CACHE_TTL", "1800"))
+ORDER_PREFETCH_WORKERS = int(os.getenv("ORDER_PREFETCH_WORKERS", "8"))
+
+
+class OrderPayloadCache:
+    """Normalised order payloads by order id, persisted with a TTL.
+
+    Retries and resumed runs reuse the payload fetched by the first
+    attempt instead of asking the backend again.
+    """
+
+    def __init__(self, path=ORDER_CACHE_PATH, ttl=ORDER_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS order_payloads ("
+            " order_id TEXT PRIMARY KEY, payload TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, order_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, fetched_at FROM order_payloads WHERE order_id = ?",
+                (str(order_id),),
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, order_id, payload):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO order_payloads (order_id, payload, fetched_at)"
+                " VALUES (?, ?, ?)",
+                (str(order_id), json.dumps(payload), time.time()),
+            )
+            self._db.commit()
+
+    def invalidate(self, order_id):
+        with self._lock:
+            self._db.execute("DELETE FROM order_payloads WHERE order_id = ?", (str(order_id),))
+            self._db.commit()
+
+    def get_or_load(self, order_id, loader):
+        payload = self.get(order_id)
+        if payload is None:
+            payload = loader(order_id)
+            self.put(order_id, payload)
+        return payload
+
+    def prefetch(self, order_ids, loader, workers=ORDER_PREFETCH_WORKERS):
+        """Load every uncached order concurrently; returns {order_id: error}."""
+        missing = [o for o in dict.fromkeys(str(o) for o in order_ids) if self.get(o) is None]
+        errors = {}
+
+        def load(order_id):
+            try:
+                self.put(order_id, loader(order_id))
+            except Exception as e:
+                errors[order_id] = repr(e)
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(load, missing))
+            print(f"📥 Prefetched {len(missing) - len(errors)}/{len(missing)} order payloads")
+        return errors
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_order_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = OrderPayloadCache()
+    return _default_cache
@@ -1,14 +1,23 @@
-import os, re, time, requests
+import os, re, time, urllib.parse
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
+from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.actions.wheel_input import ScrollOrigin
-from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import StaleElementReferenceException
+from utils import STORE_URL
+from artifacts import capture_failure
+from backend_client import BACKEND_URL, get_backend_client
+from cart_http import cart_matches, cart_summary_count, http_session, populate_cart_http, reconcile_cart
+from cart_lock import cart_lock
+from checkout_state import get_checkpoint_store, state_index
+from dom_query import fill_fields, query_all, select_option_containing
+from leases import get_lease_manager
+from metrics import failed_stage, finish_timeline, observe_resources, stage, start_timeline, timed_stage
+from order_cache import get_order_cache
+from resource_blocking import resource_report
+from waits import TimedWait, navigate, wait_for, wait_idle, wait_quote, print_wait_stats
 
-BACKEND_URL = os.getenv("BACKEND_URL", "http://31.97.78.137:3005")
-# BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:3005")
 
 BILLING_ADDRESS = {
     "firstName": "Mohamed",
@@ -22,13 +31,8 @@ BILLING_ADDRESS = {
 }
 
 
-def fetch_order_data(order_id):
-    res = requests.get(
-        f"{BACKEND_URL}/v1/order-history/internal/{order_id}", timeout=15
-    )
-    res.raise_for_status()
-
-    order = res.json()
+def _load_order_data(order_id):
+    order = get_backend_client().fetch_order(order_id)
     raw = order.get("lightspeedRawOrder", {})
 
     street = " ".join(
@@ -69,6 +73,16 @@ def fetch_order_data(order_id):
     }
 
 
+@timed_stage
+def fetch_order_data(order_id):
+    return get_order_cache().get_or_load(order_id, _load_order_data)
+
+
+def prefetch_order_data(order_ids):
+    """Fetch and normalise a batch of orders ahead of browser assignment."""
+    return get_order_cache().prefetch(order_ids, _load_order_data)
+
+
 # =====================================================
 # COMMON HELPERS
 # =====================================================
@@ -76,7 +90,7 @@ def fetch_order_data(order_id):
 def js_click_safe(driver, locator, timeout=30):
     for _ in range(3):
         try:
-            el = WebDriverWait(driver, timeout).until(
+            el = TimedWait(driver, timeout, "clickable").until(
                 EC.element_to_be_clickable(locator)
             )
             driver.execute_script("arguments[0].scrollIntoView({block:'center'});", el)
@@ -91,7 +105,7 @@ def js_click_safe(driver, locator, timeout=30):
 
 def wait_loader(driver, timeout=30):
     try:
-        WebDriverWait(driver, timeout).until(
+        TimedWait(driver, timeout, "loader_gone").until(
             EC.invisibility_of_element_located(
                 (By.CSS_SELECTOR, ".loading-mask, .loader")
             )
@@ -111,11 +125,12 @@ def close_popups(driver):
     )
 
 
+@timed_stage
 def clear_cart(driver):
     print("Checking and clearing old cart items")
 
-    driver.get("https://www.cchobby.nl/checkout/cart/")
-    time.sleep(3)
+    navigate(driver, f"{STORE_URL}/checkout/cart/", "cart")
+    wait_idle(driver, "cart_page_idle")
 
     while True:
         remove_buttons = driver.find_elements(
@@ -126,36 +141,38 @@ def clear_cart(driver):
             print("Cart already empty")
             break
 
-        print(f"Removing {len(remove_buttons)} item(s) from cart")
+        print(f"Removing item 1 of {len(remove_buttons)} from cart")
+
+        # Removing a line reloads the cart, so only the first button is
+        # ever valid; re-query after every removal.
+        btn = remove_buttons[0]
+        try:
+            driver.execute_script(
+                """
+                arguments[0].scrollIntoView({block:'center'});
+                arguments[0].click();
+                """,
+                btn,
+            )
 
-        for btn in remove_buttons:
             try:
-                driver.execute_script(
-                    "arguments[0].scrollIntoView({block:'center'});", btn
-                )
-                time.sleep(0.5)
-                driver.execute_script("arguments[0].click();", btn)
-                time.sleep(2)
-
-                try:
-                    confirm = WebDriverWait(driver, 5).until(
-                        EC.element_to_be_clickable(
-                            (By.CSS_SELECTOR, "button.action-primary.action-accept")
-                        )
+                confirm = TimedWait(driver, 5, "cart_confirm_dialog").until(
+                    EC.element_to_be_clickable(
+                        (By.CSS_SELECTOR, "button.action-primary.action-accept")
                     )
-                    confirm.click()
-                except:
-                    pass
-
-                time.sleep(3)
+                )
+                confirm.click()
             except:
                 pass
 
-        # Re-check after a pass
-        time.sleep(2)
+            wait_for(driver, "cart_item_removed", EC.staleness_of(btn), timeout=20)
+        except:
+            pass
+
+        wait_idle(driver, "cart_page_idle")
 
     # Wait until cart shows empty state (no item rows present)
-    WebDriverWait(driver, 20).until(
+    TimedWait(driver, 20, "cart_empty").until(
         lambda d: len(d.find_elements(By.CSS_SELECTOR, "a.action.action-delete, button.action-delete")) == 0
     )
 
@@ -166,11 +183,12 @@ def clear_cart(driver):
 # ADDRESS MODAL
 # =====================================================
 
+@timed_stage
 def real_mouse_scroll(driver, pixels=800):
     print("🖱️ Real mouse wheel scroll")
     origin = ScrollOrigin.from_viewport(0, 0)
     ActionChains(driver).scroll_from_origin(origin, 0, pixels).perform()
-    time.sleep(1)
+    wait_idle(driver, "after_scroll_idle", timeout=5, quiet_ms=200)
 
 
 def unlock_body_and_force_scroll(driver):
@@ -185,23 +203,25 @@ def unlock_body_and_force_scroll(driver):
         window.dispatchEvent(new Event('scroll'));
         """
     )
-    time.sleep(1.5)
+    wait_idle(driver, "after_scroll_idle", timeout=5, quiet_ms=200)
 
 
+@timed_stage
 def click_ship_here(driver):
     print("📦 Clicking 'Hier naartoe verzenden'")
 
-    btn = WebDriverWait(driver, 25).until(
+    btn = TimedWait(driver, 25, "ship_here_button").until(
         EC.element_to_be_clickable((By.CSS_SELECTOR, "button.action-save-address"))
     )
     driver.execute_script("arguments[0].click();", btn)
 
-    WebDriverWait(driver, 25).until(
+    TimedWait(driver, 25, "shipping_form_closed").until(
         EC.invisibility_of_element_located((By.ID, "co-shipping-form"))
     )
     print("✅ Address saved & modal closed")
 
 
+@timed_stage
 def _clear_magento_checkout_cache(driver):
     """Wipe all Magento checkout localStorage/sessionStorage keys."""
     driver.execute_script(
@@ -223,9 +243,9 @@ def _clear_magento_checkout_cache(driver):
         });
         """
     )
-    time.sleep(0.5)
 
 
+@timed_stage
 def force_checkout_to_shipping_step(driver):
     """
     Magento caches shipping/payment state across sessions and can land
@@ -261,15 +281,16 @@ def _reset_to_shipping_step(driver):
     """Hard-reset: clear cache then reload /checkout/ from scratch."""
 
     _clear_magento_checkout_cache(driver)
-    time.sleep(1)
 
-    driver.get("https://www.cchobby.nl/checkout/")
-    time.sleep(4)
-    wait_loader(driver)
+    try:
+        navigate(driver, f"{STORE_URL}/checkout/", "checkout")
+    except Exception:
+        pass
+    wait_idle(driver, "checkout_reload_idle", timeout=30)
 
     # Wait up to 30s for the shipping step to become visible
     try:
-        WebDriverWait(driver, 30).until(
+        TimedWait(driver, 30, "shipping_step_visible").until(
             lambda d: d.execute_script(
                 """
                 const s = document.getElementById('checkout-step-shipping');
@@ -286,10 +307,9 @@ def _reset_to_shipping_step(driver):
                 By.CSS_SELECTOR, "li[data-role='opc-nav-li'][data-name='shipping']"
             )
             driver.execute_script("arguments[0].click();", crumb)
-            time.sleep(2)
         except Exception:
             pass
-        WebDriverWait(driver, 20).until(
+        TimedWait(driver, 20, "shipping_step_visible_retry").until(
             lambda d: d.execute_script(
                 """
                 const s = document.getElementById('checkout-step-shipping');
@@ -299,6 +319,7 @@ def _reset_to_shipping_step(driver):
         )
 
 
+@timed_stage
 def ensure_address_modal_open(driver):
     print("🔍 Checking if address modal is open...")
 
@@ -308,14 +329,14 @@ def ensure_address_modal_open(driver):
         return
 
     print("📌 Clicking '+ Nieuw adres'")
-    btn = WebDriverWait(driver, 20).until(
+    btn = TimedWait(driver, 20, "new_address_button").until(
         EC.element_to_be_clickable(
             (By.XPATH, "//button[contains(.,'Nieuw adres') or contains(.,'Nieuw Adres')]")
         )
     )
     driver.execute_script("arguments[0].click();", btn)
 
-    WebDriverWait(driver, 25).until(
+    TimedWait(driver, 25, "address_modal_visible").until(
         EC.visibility_of_element_located((By.ID, "co-shipping-form"))
     )
     print("✅ Address modal opened")
@@ -325,11 +346,11 @@ def ensure_address_modal_open(driver):
 # SHIPPING
 # =====================================================
 
+@timed_stage
 def select_shipping(driver, data):
     """Select shipping method based on country and customer type."""
 
-    wait_loader(driver)
-    time.sleep(2)
+    wait_idle(driver, "shipping_methods_idle")
 
     driver.execute_script(
         """
@@ -337,73 +358,62 @@ def select_shipping(driver, data):
         if (el) el.scrollIntoView({block:'center'});
         """
     )
-    time.sleep(1)
 
-    rows_el = WebDriverWait(driver, 30).until(
-        lambda d: d.find_elements(By.CSS_SELECTOR, ".table-checkout-shipping-method .row")
+    # One round trip for every row's title and text
+    rows = TimedWait(driver, 30, "shipping_rows").until(
+        lambda d: query_all(d, ".table-checkout-shipping-method .row", ("data-title", "text"))
     )
 
-    if not rows_el:
+    if not rows:
         raise Exception("❌ No shipping rows found on page")
 
     target = None
 
+    def row_matches(row, *needles):
+        title = (row["data-title"] or "").lower()
+        text = (row["text"] or "").lower()
+        return any(n in title or n in text for n in needles)
+
     if data["country"] == "NL":
         print("🚚 NL → Looking for DPD Nederlandse Zakelijke levering")
-        for r in rows_el:
-            title = (r.get_attribute("data-title") or "").lower()
-            text = (r.text or "").lower()
-            if "nederlandse" in title or "nederlandse" in text:
-                target = r
-                break
+        target = next((r for r in rows if row_matches(r, "nederlandse")), None)
         if not target:
             # Fallback: first available row
             print("⚠️ NL specific row not found, using first available")
-            target = rows_el[0]
+            target = rows[0]
 
     elif data["country"] == "BE":
         print("🇧🇪 BE → Selecting based on business type")
-        for r in rows_el:
-            title = (r.get_attribute("data-title") or "").lower()
-            text = (r.text or "").lower()
-            if data["is_company"]:
-                if "zakelijke" in title or "zakelijke" in text:
-                    target = r
-                    break
-            else:
-                if "privé" in title or "prive" in title or "privé" in text:
-                    target = r
-                    break
+        if data["is_company"]:
+            target = next((r for r in rows if row_matches(r, "zakelijke")), None)
+        else:
+            target = next((r for r in rows if row_matches(r, "privé", "prive")), None)
         if not target:
             print("⚠️ BE specific row not found, using first available")
-            target = rows_el[0]
+            target = rows[0]
 
     else:
         print(f"🌍 Country {data['country']} → using first available shipping")
-        target = rows_el[0]
+        target = rows[0]
 
     if not target:
         raise Exception("❌ No shipping option matched")
 
-    print("👉 Clicking shipping row:", target.get_attribute("data-title"))
+    print("👉 Clicking shipping row:", target["data-title"])
 
+    # Click the row and the radio inside it
     driver.execute_script(
         """
         arguments[0].scrollIntoView({block:'center'});
         arguments[0].click();
+        const radio = arguments[0].querySelector("input[type='radio']");
+        if (radio) radio.click();
         """,
-        target,
+        target["element"],
     )
 
-    # Also click the radio inside the row directly
-    try:
-        radio = target.find_element(By.CSS_SELECTOR, "input[type='radio']")
-        driver.execute_script("arguments[0].click();", radio)
-    except:
-        pass
-
     # Confirm Magento state
-    WebDriverWait(driver, 30).until(
+    TimedWait(driver, 30, "quote_shipping_method").until(
         lambda d: d.execute_script(
             """
             try {
@@ -423,7 +433,7 @@ def select_shipping(driver, data):
 
 def wait_shipping_confirmed(driver):
     print("⏳ Waiting for shipping state")
-    WebDriverWait(driver, 30).until(
+    TimedWait(driver, 30, "quote_shipping_method").until(
         lambda d: d.execute_script(
             """
             try {
@@ -436,6 +446,7 @@ def wait_shipping_confirmed(driver):
     print("✅ Shipping confirmed")
 
 
+@timed_stage
 def handle_save_address_popup(driver):
     print("📦 Handling 'Save address' popup")
     driver.execute_script(
@@ -454,11 +465,12 @@ def handle_save_address_popup(driver):
         window.dispatchEvent(new Event('scroll'));
         """
     )
-    time.sleep(1)
+    wait_idle(driver, "save_address_popup_idle", timeout=5, quiet_ms=200)
 
 
+@timed_stage
 def confirm_shipping_js(driver):
-    WebDriverWait(driver, 30).until(
+    TimedWait(driver, 30, "quote_shipping_method_code").until(
         lambda d: d.execute_script(
             """
             try {
@@ -470,6 +482,7 @@ def confirm_shipping_js(driver):
     )
 
 
+@timed_stage
 def unlock_and_scroll_to_payment(driver):
     driver.execute_script(
         """
@@ -483,9 +496,10 @@ def unlock_and_scroll_to_payment(driver):
         }
         """
     )
-    time.sleep(1)
+    wait_idle(driver, "after_scroll_idle", timeout=5, quiet_ms=200)
 
 
+@timed_stage
 def human_scroll_to_payment(driver):
     driver.execute_script(
         """
@@ -495,11 +509,13 @@ def human_scroll_to_payment(driver):
         const targetY = rect.top + window.pageYOffset - 200;
         let currentY = window.pageYOffset;
         const step = 120;
+        window.__paymentScrollDone = false;
         const interval = setInterval(() => {
             if (currentY >= targetY) {
                 clearInterval(interval);
                 target.scrollIntoView({ block: 'center' });
                 window.dispatchEvent(new Event('scroll'));
+                window.__paymentScrollDone = true;
             } else {
                 window.scrollBy(0, step);
                 currentY += step;
@@ -507,12 +523,24 @@ def human_scroll_to_payment(driver):
         }, 60);
         """
     )
-    time.sleep(2)
+    try:
+        wait_for(
+            driver,
+            "payment_scroll_done",
+            lambda d: d.execute_script(
+                "return !document.getElementById('checkout-payment-method-load')"
+                " || window.__paymentScrollDone === true;"
+            ),
+            timeout=10,
+        )
+    except Exception:
+        pass
 
 
+@timed_stage
 def force_totals_recalculation(driver):
     print("🔄 Forcing totals recalculation")
-    WebDriverWait(driver, 30).until(
+    TimedWait(driver, 30, "totals_estimate_started").until(
         lambda d: d.execute_script(
             """
             try {
@@ -528,7 +556,7 @@ def force_totals_recalculation(driver):
             """
         )
     )
-    WebDriverWait(driver, 30).until(
+    TimedWait(driver, 30, "quote_totals").until(
         lambda d: d.execute_script(
             """
             try {
@@ -540,10 +568,11 @@ def force_totals_recalculation(driver):
     print("✅ Totals ready")
 
 
+@timed_stage
 def select_bank_transfer(driver):
     print("💳 Waiting for payment methods...")
 
-    WebDriverWait(driver, 60).until(
+    TimedWait(driver, 60, "payment_methods_rendered").until(
         lambda d: d.execute_script(
             """
             const radios = document.querySelectorAll(
@@ -557,12 +586,12 @@ def select_bank_transfer(driver):
 
     print("💳 Selecting Bankoverschrijving...")
 
-    radio = WebDriverWait(driver, 40).until(
+    radio = TimedWait(driver, 40, "banktransfer_radio").until(
         EC.presence_of_element_located((By.ID, "banktransfer"))
     )
 
     driver.execute_script("arguments[0].scrollIntoView({block:'center'});", radio)
-    time.sleep(1)
+    wait_idle(driver, "after_scroll_idle", timeout=5, quiet_ms=200)
 
     driver.execute_script(
         """
@@ -573,7 +602,7 @@ def select_bank_transfer(driver):
         radio,
     )
 
-    WebDriverWait(driver, 30).until(
+    TimedWait(driver, 30, "quote_payment_banktransfer").until(
         lambda d: d.execute_script(
             """
             try {
@@ -587,9 +616,10 @@ def select_bank_transfer(driver):
     print("✅ Bankoverschrijving selected in Magento")
 
 
+@timed_stage
 def wait_payment_ready(driver):
     print("⏳ Waiting for payment methods to render")
-    WebDriverWait(driver, 60).until(
+    TimedWait(driver, 60, "payment_methods_rendered").until(
         lambda d: d.execute_script(
             """
             try {
@@ -606,6 +636,7 @@ def wait_payment_ready(driver):
     print("✅ Payment methods rendered")
 
 
+@timed_stage
 def force_banktransfer_js(driver):
     print("⚙️ Forcing Bankoverschrijving via Magento JS")
     driver.execute_script(
@@ -620,10 +651,11 @@ def force_banktransfer_js(driver):
     )
 
 
+@timed_stage
 def click_shipping_next(driver):
     print("➡️ Clicking shipping NEXT")
 
-    WebDriverWait(driver, 60).until(
+    TimedWait(driver, 60, "quote_shipping_carrier").until(
         lambda d: d.execute_script(
             """
             try {
@@ -634,11 +666,11 @@ def click_shipping_next(driver):
         )
     )
 
-    WebDriverWait(driver, 60).until(
+    TimedWait(driver, 60, "loader_gone").until(
         EC.invisibility_of_element_located((By.CSS_SELECTOR, ".loading-mask, .loader"))
     )
 
-    btn = WebDriverWait(driver, 60).until(
+    btn = TimedWait(driver, 60, "shipping_next_button").until(
         lambda d: d.find_element(
             By.CSS_SELECTOR,
             "#shipping-method-buttons-container button.continue:not([disabled])",
@@ -646,15 +678,16 @@ def click_shipping_next(driver):
     )
 
     driver.execute_script("arguments[0].scrollIntoView({block:'center'});", btn)
-    time.sleep(1)
+    wait_idle(driver, "after_scroll_idle", timeout=5, quiet_ms=200)
     driver.execute_script("arguments[0].click();", btn)
 
-    WebDriverWait(driver, 60).until(
+    TimedWait(driver, 60, "payment_step_present").until(
         EC.presence_of_element_located((By.ID, "checkout-step-payment"))
     )
     print("✅ Payment step opened")
 
 
+@timed_stage
 def force_totals(driver):
     driver.execute_script(
         """
@@ -668,6 +701,7 @@ def force_totals(driver):
     )
 
 
+@timed_stage
 def accept_terms(driver):
     driver.execute_script(
         """
@@ -699,10 +733,11 @@ def clean_city(city):
     return city
 
 
+@timed_stage
 def fill_address_modal(driver, data):
     print("🏠 Filling address modal")
 
-    modal = WebDriverWait(driver, 30).until(
+    modal = TimedWait(driver, 30, "shipping_form_present").until(
         EC.presence_of_element_located((By.ID, "co-shipping-form"))
     )
 
@@ -724,9 +759,9 @@ def fill_address_modal(driver, data):
     set_field_js(driver, by_name("telephone"), data["phone"])
 
     Select(by_name("country_id")).select_by_value(data["country"])
-    time.sleep(1)
+    wait_idle(driver, "country_change_idle", timeout=5, quiet_ms=200)
 
-    WebDriverWait(driver, 25).until(
+    TimedWait(driver, 25, "save_address_enabled").until(
         lambda d: d.execute_script(
             """
             const btn = document.querySelector('button.action-save-address');
@@ -737,6 +772,7 @@ def fill_address_modal(driver, data):
     print("✅ Address accepted by Magento")
 
 
+@timed_stage
 def set_billing_address(driver):
     print("💼 Setting billing address to company address...")
 
@@ -747,10 +783,9 @@ def set_billing_address(driver):
         """
     )
 
-    time.sleep(2)
-    wait_loader(driver)
+    wait_idle(driver, "billing_form_idle")
 
-    container = WebDriverWait(driver, 30).until(
+    container = TimedWait(driver, 30, "billing_form").until(
         lambda d: d.find_element(
             By.CSS_SELECTOR,
             ".payment-method._active .billing-address-form, "
@@ -762,65 +797,30 @@ def set_billing_address(driver):
 
     try:
         select_el = container.find_element(By.CSS_SELECTOR, "select[name='billing_address_id']")
-        matched = None
-        for opt in select_el.find_elements(By.TAG_NAME, "option"):
-            txt = (opt.text or "").lower()
-            if (
-                BILLING_ADDRESS["lastName"].lower() in txt
-                and BILLING_ADDRESS["city"].lower() in txt
-            ):
-                matched = opt.text
-                break
+        matched = select_option_containing(
+            driver, select_el, [BILLING_ADDRESS["lastName"], BILLING_ADDRESS["city"]]
+        )
         if matched:
-            Select(select_el).select_by_visible_text(matched)
-            driver.execute_script(
-                "arguments[0].dispatchEvent(new Event('change', {bubbles:true}));",
-                select_el,
-            )
-            time.sleep(1)
+            wait_idle(driver, "billing_select_idle")
     except:
         pass
 
-    def find_in_billing(selectors):
-        for selector in selectors:
-            try:
-                el = container.find_element(By.CSS_SELECTOR, selector)
-                if el.is_displayed():
-                    return el
-            except:
-                pass
-        return None
-
     print("📝 Filling billing address form fields...")
 
-    fields = {
-        "firstname": ["input[name='firstname']", "input[name*='firstname']"],
-        "lastname": ["input[name='lastname']", "input[name*='lastname']"],
-        "company": ["input[name='company']", "input[name*='company']"],
-        "street": ["input[name='street[0]']", "input[name*='street[0]']"],
-        "postcode": ["input[name='postcode']", "input[name*='postcode']"],
-        "city": ["input[name='city']", "input[name*='city']"],
-        "telephone": ["input[name='telephone']", "input[name*='telephone']"],
-    }
-
-    mapping = {
-        "firstname": BILLING_ADDRESS["firstName"],
-        "lastname": BILLING_ADDRESS["lastName"],
-        "company": BILLING_ADDRESS["company"],
-        "street": BILLING_ADDRESS["street"],
-        "postcode": BILLING_ADDRESS["zipcode"],
-        "city": BILLING_ADDRESS["city"],
-        "telephone": BILLING_ADDRESS["phone"],
-    }
-
-    for key, selectors in fields.items():
-        el = find_in_billing(selectors)
-        if el:
-            set_field_js(driver, el, mapping[key])
-
-    country_el = find_in_billing(["select[name='country_id']", "select[name*='country_id']"])
-    if country_el:
-        Select(country_el).select_by_value(BILLING_ADDRESS["country"])
+    fill_fields(
+        driver,
+        {
+            "firstname": (["input[name='firstname']", "input[name*='firstname']"], BILLING_ADDRESS["firstName"]),
+            "lastname": (["input[name='lastname']", "input[name*='lastname']"], BILLING_ADDRESS["lastName"]),
+            "company": (["input[name='company']", "input[name*='company']"], BILLING_ADDRESS["company"]),
+            "street": (["input[name='street[0]']", "input[name*='street[0]']"], BILLING_ADDRESS["street"]),
+            "postcode": (["input[name='postcode']", "input[name*='postcode']"], BILLING_ADDRESS["zipcode"]),
+            "city": (["input[name='city']", "input[name*='city']"], BILLING_ADDRESS["city"]),
+            "telephone": (["input[name='telephone']", "input[name*='telephone']"], BILLING_ADDRESS["phone"]),
+            "country": (["select[name='country_id']", "select[name*='country_id']"], BILLING_ADDRESS["country"]),
+        },
+        root=container,
+    )
 
     try:
         update_btn = container.find_element(
@@ -831,8 +831,7 @@ def set_billing_address(driver):
         )
         if update_btn.is_displayed():
             driver.execute_script("arguments[0].click();", update_btn)
-            time.sleep(2)
-            wait_loader(driver)
+            wait_idle(driver, "billing_update_idle")
     except:
         pass
 
@@ -854,79 +853,124 @@ def set_billing_address(driver):
         BILLING_ADDRESS["country"], BILLING_ADDRESS["phone"],
     )
 
-    time.sleep(2)
+    try:
+        wait_quote(
+            driver,
+            "billing_address_set",
+            "quote.billingAddress() && quote.billingAddress().city === %s"
+            % repr(BILLING_ADDRESS["city"]),
+            timeout=10,
+        )
+    except Exception:
+        pass
     print("✅ Billing address set")
 
-def add_product_to_cart(driver, sku, qty):
-    print(f"🔍 Adding SKU={sku} qty={qty}")
-    driver.get("https://www.cchobby.nl/")
-    wait_loader(driver)
+# Adds the first search result to the cart with the requested quantity and
+# counts the XHR/fetch requests the add starts, so the caller can wait for
+# them before navigating away (which would abort the add).
+ADD_FROM_RESULTS_JS = """
+const qty = arguments[0];
+if (!window.__inflightWatch) {
+    window.__inflight = 0;
+    const done = () => { window.__inflight = Math.max(0, window.__inflight - 1); };
+    const send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        window.__inflight++;
+        this.addEventListener('loadend', done);
+        return send.apply(this, arguments);
+    };
+    const fetch = window.fetch;
+    window.fetch = function() {
+        window.__inflight++;
+        return fetch.apply(this, arguments).finally(done);
+    };
+    window.__inflightWatch = true;
+}
+const form = document.querySelector("form[data-role='tocart-form']");
+if (!form) {
+    return {ok: false, reason: document.querySelector('.product-item') ? 'no_form' : 'no_results'};
+}
+const button = form.querySelector('button.tocart, button.amquote-addto-button');
+if (!button) return {ok: false, reason: 'no_button'};
+let input = form.querySelector("input[name='qty']");
+if (!input) {
+    input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = 'qty';
+    form.appendChild(input);
+}
+input.value = qty;
+['input', 'change'].forEach(t => input.dispatchEvent(new Event(t, {bubbles: true})));
+button.click();
+return {ok: true};
+"""
 
-    search = WebDriverWait(driver, 20).until(
-        EC.element_to_be_clickable((By.NAME, "q"))
-    )
-    search.clear()
-    search.send_keys(sku)
-    time.sleep(1)
-    search.send_keys(Keys.ENTER)
 
-    wait_loader(driver)
+def _minicart_count(driver):
+    try:
+        return cart_summary_count(http_session(driver))
+    except Exception as e:
+        print("⚠️ Could not read cart count:", repr(e))
+        return None
 
-    WebDriverWait(driver, 20).until(
-        lambda d: d.find_elements(By.CSS_SELECTOR, ".product-item")
-    )
 
-    form = WebDriverWait(driver, 20).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "form[data-role='tocart-form']"))
-    )
+@timed_stage
+def add_products_to_cart(driver, lines):
+    """UI add-to-cart for several lines straight from the search results pages.
 
-    # Set quantity via the + button if qty > 1
-    if qty > 1:
-        try:
-            plus_btn = form.find_element(By.CSS_SELECTOR, ".qty-change.increase")
-            driver.execute_script("arguments[0].scrollIntoView({block:'center'});", plus_btn)
-            time.sleep(0.5)
-            for _ in range(qty - 1):
-                driver.execute_script("arguments[0].click();", plus_btn)
-                time.sleep(0.3)
-            print(f"✅ Qty set via + button: {qty}")
-        except Exception as e:
-            print(f"❌ Failed to click + button: {e}")
-            # Fallback: set qty input directly
-            try:
-                qty_input = form.find_element(By.CSS_SELECTOR, "input[name='qty']")
-                set_field_js(driver, qty_input, str(qty))
-            except:
-                pass
+    One navigation and one script per SKU; the minicart counter is waited
+    on once, for the expected total quantity.
+    """
+    if not lines:
+        return
 
-    # Click Add to Cart
-    add_btn = form.find_element(
-        By.CSS_SELECTOR, "button.tocart, button.amquote-addto-button"
-    )
-    driver.execute_script("arguments[0].click();", add_btn)
-    wait_loader(driver)
+    start_count = _minicart_count(driver)
+    failed = []
+    for line in lines:
+        sku = str(line["sku"]).strip()
+        qty = int(line["qty"])
+        print(f"🔍 Adding SKU={sku} qty={qty}")
+
+        url = f"{STORE_URL}/catalogsearch/result/?" + urllib.parse.urlencode({"q": sku})
+        navigate(driver, url, "search_results", timeout=20)
+        result = driver.execute_script(ADD_FROM_RESULTS_JS, qty)
+        if not result["ok"]:
+            print(f"❌ SKU {sku} not added: {result['reason']}")
+            failed.append(sku)
+            continue
+
+        wait_for(
+            driver,
+            "tocart_request",
+            lambda d: d.execute_script("return window.__inflight === 0;"),
+            timeout=20,
+        )
 
-    # Wait for minicart counter to reflect the addition
-    WebDriverWait(driver, 40).until(
+    if failed:
+        raise Exception(f"Could not add SKUs to cart: {', '.join(failed)}")
+
+    expected = (start_count or 0) + sum(int(line["qty"]) for line in lines)
+    TimedWait(driver, 40, "minicart_counter").until(
         lambda d: d.execute_script(
             """
             const c = document.querySelector('.counter-number');
-            return c && parseInt(c.innerText || '0') > 0;
-            """
+            return c && parseInt(c.innerText || '0') >= arguments[0];
+            """,
+            expected,
         )
     )
-    print(f"🛒 SKU {sku} added to cart")
+    print(f"🛒 {len(lines)} line(s) added, cart now holds {expected} item(s)")
 
 
-
-def click_place_order(driver):
+@timed_stage
+def click_place_order(driver, order_id):
     print("🚀 Finalizing order placement")
 
     handle_save_address_popup(driver)
     wait_loader(driver)
     accept_terms(driver)
 
-    WebDriverWait(driver, 40).until(
+    TimedWait(driver, 40, "place_order_ready").until(
         lambda d: d.execute_script(
             """
             try {
@@ -940,15 +984,13 @@ def click_place_order(driver):
         )
     )
 
-    already_clicked = driver.execute_script(
-        """
-        if (window.__orderSubmitLock) { return true; }
-        window.__orderSubmitLock = true;
-        return false;
-        """
-    )
-    if already_clicked:
-        raise Exception("Order submission already triggered; refusing to click again")
+    # Durable guard: claimed before the click and never released
+    # automatically, so no retry, process or other browser can submit twice.
+    if not get_checkpoint_store().claim_submit(order_id):
+        raise Exception(
+            f"Order {order_id} was already submitted once; check the supplier "
+            "and clear its checkpoint before retrying"
+        )
 
     btn = driver.find_element(By.CSS_SELECTOR, "button.action.primary.checkout")
     driver.execute_script(
@@ -961,7 +1003,7 @@ def click_place_order(driver):
         btn,
     )
 
-    WebDriverWait(driver, 120).until(
+    TimedWait(driver, 120, "place_order_submitted").until(
         lambda d: "success" in d.current_url.lower()
         or d.execute_script(
             """
@@ -980,148 +1022,293 @@ def click_place_order(driver):
 # MAIN FLOW
 # =====================================================
 
-def place_order(driver, order_id):
-    try:
-        wait = WebDriverWait(driver, 60)
-        data = fetch_order_data(order_id)
-        print("📦 BACKEND PRODUCTS:", data["products"])
+def _report(progress, step):
+    if progress:
+        try:
+            progress(step)
+        except Exception as e:
+            print("⚠️ Progress callback failed:", repr(e))
 
-        driver.get("https://www.cchobby.nl/")
-        time.sleep(3)
-        close_popups(driver)
 
-        clear_cart(driver)
+# Live checkout state from the quote model, used to validate a checkpoint
+# before resuming from it.
+QUOTE_STATE_JS = """
+try {
+    const q = require('Magento_Checkout/js/model/quote');
+    const ship = q.shippingAddress() || {};
+    const billing = q.billingAddress() || {};
+    const payment = q.paymentMethod();
+    return {
+        postcode: ship.postcode || null,
+        country: ship.countryId || ship.country_id || null,
+        shippingMethod: !!q.shippingMethod(),
+        payment: payment ? payment.method : null,
+        billingCity: billing.city || null
+    };
+} catch(e) { return null; }
+"""
 
-        driver.get("https://www.cchobby.nl/")
-        wait_loader(driver)
-        close_popups(driver)
 
-        # --------------------------------------------------
-        # ADD ALL PRODUCTS TO CART (fixed loop)
-        # --------------------------------------------------
-        for line in data["products"]:
-            sku = str(line["sku"]).strip()
-            qty = int(line["qty"])
-            print("PROCESSING SKU:", sku)
-            print("PROCESSING QTY:", qty)
+def _same_postcode(a, b):
+    return re.sub(r"\s", "", a or "").upper() == re.sub(r"\s", "", b or "").upper()
 
-            add_product_to_cart(driver, sku, qty)
 
-        # --------------------------------------------------
-        # PROCEED TO CHECKOUT
-        # --------------------------------------------------
-        # ── Pre-clear Magento checkout cache BEFORE navigating to checkout ──
-        print("🧹 Pre-clearing Magento checkout cache...")
-        _clear_magento_checkout_cache(driver)
+def _live_state(driver, data, checkpoint):
+    """Highest state up to `checkpoint` that still holds in the live session."""
+    if checkpoint == "start" or not cart_matches(driver, data["products"]):
+        return "start"
+    if checkpoint == "cart_populated":
+        return "cart_populated"
 
-        driver.get("https://www.cchobby.nl/checkout/")
-        wait.until(EC.url_contains("/checkout"))
-        wait_loader(driver)
+    # The shipping step keeps the address; later states live on the payment step.
+    step = "shipping" if checkpoint == "address_set" else "payment"
+    try:
+        navigate(driver, f"{STORE_URL}/checkout/#{step}", "checkout", timeout=60)
+        wait_idle(driver, "checkout_resume_idle", timeout=30)
+        quote = driver.execute_script(QUOTE_STATE_JS)
+    except Exception as e:
+        print("⚠️ Could not read quote for resume:", repr(e))
+        return "cart_populated"
+    if not quote:
+        return "cart_populated"
+
+    checks = [
+        ("address_set", _same_postcode(quote["postcode"], data["zipcode"])
+            and quote["country"] == data["country"]),
+        ("shipping_selected", quote["shippingMethod"]),
+        ("payment_selected", quote["payment"] == "banktransfer"),
+        ("billing_set", quote["billingCity"] == BILLING_ADDRESS["city"]),
+    ]
+    state = "cart_populated"
+    for name, ok in checks:
+        if state_index(name) > state_index(checkpoint) or not ok:
+            break
+        state = name
+    return state
 
-        # ── CRITICAL: force step 1 before doing anything else ──
-        force_checkout_to_shipping_step(driver)
 
-        ensure_address_modal_open(driver)
-        fill_address_modal(driver, data)
-        click_ship_here(driver)
-        real_mouse_scroll(driver, 900)
+def _step_cart(driver, data):
+    # Pooled sessions are parked on the homepage already.
+    if not driver.current_url.startswith(STORE_URL):
+        navigate(driver, f"{STORE_URL}/", "homepage")
+        wait_idle(driver, "homepage_idle")
+    close_popups(driver)
 
-        select_shipping(driver, data)
-        click_shipping_next(driver)
+    # Diff first, clear + re-add as fallback
+    with stage("reconcile_cart"):
+        missing = reconcile_cart(driver, data["products"])
+    if missing is None:
+        clear_cart(driver)
 
-        handle_save_address_popup(driver)
-        force_totals_recalculation(driver)
+        with stage("populate_cart_http"):
+            missing = populate_cart_http(driver, data["products"])
 
-        real_mouse_scroll(driver, 600)
-        confirm_shipping_js(driver)
+    add_products_to_cart(driver, missing)
 
-        unlock_and_scroll_to_payment(driver)
-        human_scroll_to_payment(driver)
 
-        wait_payment_ready(driver)
+def _step_address(driver, data):
+    # ── Pre-clear Magento checkout cache BEFORE navigating to checkout ──
+    print("🧹 Pre-clearing Magento checkout cache...")
+    _clear_magento_checkout_cache(driver)
 
-        try:
-            select_bank_transfer(driver)
-            print("🛒 select_bank_transfer done")
-        except:
-            force_banktransfer_js(driver)
-            print("🛒 force_banktransfer_js done")
+    navigate(driver, f"{STORE_URL}/checkout/", "checkout", timeout=60)
+    wait_loader(driver)
 
-        # ✅ FIXED: single clean JS condition (no double return)
-        WebDriverWait(driver, 30).until(
-            lambda d: d.execute_script(
-                """
-                try {
-                    const q = require('Magento_Checkout/js/model/quote');
-                    return q.paymentMethod() &&
-                           q.paymentMethod().method === 'banktransfer';
-                } catch(e) { return false; }
-                """
-            )
-        )
+    # ── CRITICAL: force step 1 before doing anything else ──
+    force_checkout_to_shipping_step(driver)
 
-        wait_payment_ready(driver)
-        force_totals(driver)
-        wait_loader(driver)
+    ensure_address_modal_open(driver)
+    fill_address_modal(driver, data)
+    click_ship_here(driver)
+    real_mouse_scroll(driver, 900)
 
-        set_billing_address(driver)
-        wait_loader(driver)
 
-        WebDriverWait(driver, 20).until(
-            lambda d: "Moordrecht" in d.page_source and "Postbus 3" in d.page_source
-        )
+def _step_shipping(driver, data):
+    select_shipping(driver, data)
+    click_shipping_next(driver)
+
+    handle_save_address_popup(driver)
+    force_totals_recalculation(driver)
+
+    real_mouse_scroll(driver, 600)
+    confirm_shipping_js(driver)
+
+
+def _step_payment(driver, data):
+    unlock_and_scroll_to_payment(driver)
+    human_scroll_to_payment(driver)
+
+    wait_payment_ready(driver)
 
-        accept_terms(driver)
+    try:
+        select_bank_transfer(driver)
+        print("🛒 select_bank_transfer done")
+    except:
+        force_banktransfer_js(driver)
+        print("🛒 force_banktransfer_js done")
 
-        driver.execute_script(
+    # ✅ FIXED: single clean JS condition (no double return)
+    TimedWait(driver, 30, "quote_payment_banktransfer").until(
+        lambda d: d.execute_script(
             """
             try {
                 const q = require('Magento_Checkout/js/model/quote');
-                console.log("PAYMENT:", JSON.stringify(q.paymentMethod()));
-                console.log("SHIPPING:", JSON.stringify(q.shippingMethod()));
-                console.log("TOTALS:", JSON.stringify(q.totals()));
-            } catch(e) { console.log(e); }
+                return q.paymentMethod() &&
+                       q.paymentMethod().method === 'banktransfer';
+            } catch(e) { return false; }
             """
         )
+    )
 
-        click_place_order(driver)
+    wait_payment_ready(driver)
+    force_totals(driver)
+    wait_loader(driver)
 
-        WebDriverWait(driver, 120).until(
-            lambda d: "success" in d.current_url.lower()
-            or d.find_elements(By.CSS_SELECTOR, ".checkout-success-container")
-            or d.find_elements(By.CSS_SELECTOR, ".checkout-onepage-success")
-        )
 
-        order_no = driver.execute_script(
-            """
-            const el = document.querySelector('.block.thank-you-note span');
-            return el ? el.innerText.trim() : null;
-            """
+def _step_billing(driver, data):
+    set_billing_address(driver)
+    wait_loader(driver)
+
+    TimedWait(driver, 20, "billing_address_rendered").until(
+        lambda d: "Moordrecht" in d.page_source and "Postbus 3" in d.page_source
+    )
+
+
+def _step_submit(driver, data, order_id):
+    accept_terms(driver)
+
+    driver.execute_script(
+        """
+        try {
+            const q = require('Magento_Checkout/js/model/quote');
+            console.log("PAYMENT:", JSON.stringify(q.paymentMethod()));
+            console.log("SHIPPING:", JSON.stringify(q.shippingMethod()));
+            console.log("TOTALS:", JSON.stringify(q.totals()));
+        } catch(e) { console.log(e); }
+        """
+    )
+
+    click_place_order(driver, order_id)
+
+    TimedWait(driver, 120, "success_page").until(
+        lambda d: "success" in d.current_url.lower()
+        or d.find_elements(By.CSS_SELECTOR, ".checkout-success-container")
+        or d.find_elements(By.CSS_SELECTOR, ".checkout-onepage-success")
+    )
+
+    return driver.execute_script(
+        """
+        const el = document.querySelector('.block.thank-you-note span');
+        return el ? el.innerText.trim() : null;
+        """
+    )
+
+
+# (state reached, progress step, step function)
+CHECKOUT_STEPS = (
+    ("cart_populated", "cart", _step_cart),
+    ("address_set", "address", _step_address),
+    ("shipping_selected", "shipping", _step_shipping),
+    ("payment_selected", "payment", _step_payment),
+    ("billing_set", "billing", _step_billing),
+)
+
+
+def _checkout(driver, order_id, data, progress=None, account=None):
+    """Cart + checkout on the live session; caller must hold the cart lock.
+
+    Runs the CHECKOUT_STEPS state machine, checkpointing after every step.
+    A retry resumes after the last checkpoint that the live cart and quote
+    still confirm.
+    """
+    checkpoints = get_checkpoint_store()
+    submission = checkpoints.submission(order_id)
+    if submission:
+        if submission["supplier_order_number"]:
+            print(f"✅ Order {order_id} already placed as {submission['supplier_order_number']}")
+            return submission["supplier_order_number"]
+        raise Exception(
+            f"Order {order_id} was submitted before without confirmation; "
+            "check the supplier and clear its checkpoint before retrying"
         )
 
+    checkpoint = checkpoints.get(order_id)
+    state = _live_state(driver, data, checkpoint)
+    if state != "start":
+        print(f"♻️ Resuming order {order_id} after '{state}' (checkpoint '{checkpoint}')")
+
+    for reached, step, run in CHECKOUT_STEPS:
+        if state_index(reached) <= state_index(state):
+            continue
+        _report(progress, step)
+        with stage(f"state_{reached}"):
+            run(driver, data)
+        checkpoints.save(order_id, reached, account)
+
+    # A missed heartbeat may have let another worker into this cart
+    cart_lock(account).check()
+    _report(progress, "submitting")
+    order_no = _step_submit(driver, data, order_id)
+    checkpoints.finish_submit(order_id, order_no, account)
+    return order_no
+
+
+def _report_resources(driver):
+    report = resource_report(driver)
+    observe_resources(report)
+    print(
+        f"🌐 RESOURCES: {report['loadedRequests']} loaded "
+        f"({report['loadedBytes'] // 1024} KiB), {report['blockedRequests']} blocked"
+    )
+
+
+def place_order(driver, order_id, progress=None, account=None):
+    """Place one backend order with `driver`, logged in to `account`.
+
+    `account` defaults to SUPPLIER_EMAIL and picks the cart lock and the
+    account recorded with the order's checkpoints.
+    """
+    account = account or os.getenv("SUPPLIER_EMAIL", "")
+    start_timeline(order_id)
+    # Drop whatever the session loaded before this order.
+    resource_report(driver)
+    try:
+        _report(progress, "fetch_order")
+        data = fetch_order_data(order_id)
+        print("📦 BACKEND PRODUCTS:", data["products"])
+
+        # One worker on any host per order, then one checkout per cart
+        order_lease = get_lease_manager().hold(f"order:{order_id}", timeout=0)
+        with order_lease, cart_lock(account), stage("checkout"):
+            order_no = _checkout(driver, order_id, data, progress, account)
+        _report(progress, "submitted")
+
+        _report(progress, "sync")
         print("📡 Syncing order to backend...")
         print("BACKEND_URL =", BACKEND_URL)
         print("ORDER ID =", order_id)
         print("ORDER NO =", order_no)
 
         try:
-            res = requests.post(
-                f"{BACKEND_URL}/v1/order-history/order-sync/{order_id}",
-                json={"supplierOrderNumber": order_no, "status": "ORDERED_AT_SUPPLIER"},
-                headers={"Content-Type": "application/json"},
-                timeout=15,
-            )
+            with stage("backend_sync"):
+                res = get_backend_client().sync_order(order_id, order_no)
             print("📡 SYNC STATUS:", res.status_code)
             print("📡 SYNC BODY:", res.text)
-            res.raise_for_status()
         except Exception as e:
             print("❌ ORDER SYNC FAILED:", repr(e))
 
+        get_order_cache().invalidate(order_id)
         print("🎉 ORDER COMPLETED + SYNCED")
+        print_wait_stats()
+        _report_resources(driver)
+        finish_timeline("success" if order_no else "no_order_number")
         return order_no
 
     except Exception as e:
         import traceback
         print("MAIN ERROR:", repr(e))
         traceback.print_exc()
+        capture_failure(driver, order_id, failed_stage(e), e)
+        _report_resources(driver)
+        finish_timeline("error")
         raise
\ No newline at end of file
@@ -0,0 +1,151 @@
+import fnmatch
+import json
+import os
+
+from utils import STORE_URL
+
+RESOURCE_BLOCKING_PROFILE = os.getenv("RESOURCE_BLOCKING_PROFILE", "full")
+# Extra comma separated URL patterns to block / never block (globs)
+RESOURCE_BLOCKING_EXTRA = [p for p in os.getenv("RESOURCE_BLOCKING_EXTRA", "").split(",") if p]
+RESOURCE_BLOCKING_ALLOW = [p for p in os.getenv("RESOURCE_BLOCKING_ALLOW", "").split(",") if p]
+# Per-order request/byte report; needs Chrome's performance log, which
+# costs a CDP event per network event, so only order drivers enable it.
+RESOURCE_REPORT_ENABLED = os.getenv("RESOURCE_REPORT_ENABLED", "1") == "1"
+
+IMAGE_PATTERNS = ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.ico*"]
+FONT_PATTERNS = ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"]
+MEDIA_PATTERNS = ["*.mp4*", "*.webm*", "*.mp3*"]
+THIRD_PARTY_PATTERNS = [
+    "*klaviyo.com*",
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*facebook.net*",
+    "*facebook.com/tr*",
+    "*hotjar.com*",
+    "*clarity.ms*",
+    "*bing.com*",
+    "*tiktok.com*",
+    "*pinterest.com*",
+    "*tawk.to*",
+    "*zopim.com*",
+    "*zendesk.com*",
+    "*trustpilot.com*",
+    "*kiyoh.com*",
+    "*youtube.com*",
+    "*vimeo.com*",
+]
+
+PROFILES = {
+    "off": [],
+    "lite": IMAGE_PATTERNS + FONT_PATTERNS,
+    "full": IMAGE_PATTERNS + FONT_PATTERNS + MEDIA_PATTERNS + THIRD_PARTY_PATTERNS,
+}
+
+# The checkout is driven through these RequireJS modules and the customer
+# section data; no block pattern may overlap them.
+MAGENTO_REQUIRED_PATTERNS = [
+    "*/static/*/requirejs/*",
+    "*/static/*/requirejs-config*",
+    "*/static/*/mage/*",
+    "*/static/*/jquery*",
+    "*/static/*/Magento_Checkout/*",
+    "*/static/*/Magento_Customer/*",
+    "*/customer/section/load*",
+]
+# Endings a required pattern's trailing wildcard stands for in practice
+_REQUIRED_SUFFIXES = ("", ".js", ".min.js", ".js?v=1", ".json", "/?sections=cart")
+
+
+def _overlaps(block, allow):
+    """Whether a URL the checkout needs could match both glob patterns."""
+    if fnmatch.fnmatch(allow, block) or fnmatch.fnmatch(block, allow):
+        return True
+    # Fill the allow pattern in as concrete storefront URLs: the leading
+    # wildcard is the store, inner ones a path segment, the trailing one
+    # the usual endings of scripts and section data.
+    probe = allow
+    if probe.startswith("*"):
+        probe = STORE_URL + probe[1:]
+    probe = probe.replace("*", "x")
+    return any(fnmatch.fnmatch(probe + suffix, block) for suffix in _REQUIRED_SUFFIXES)
+
+
+def blocked_patterns(profile=RESOURCE_BLOCKING_PROFILE):
+    if profile not in PROFILES:
+        raise Exception(f"Unknown RESOURCE_BLOCKING_PROFILE: {profile}")
+    patterns = PROFILES[profile] + RESOURCE_BLOCKING_EXTRA
+    required = MAGENTO_REQUIRED_PATTERNS + RESOURCE_BLOCKING_ALLOW
+    kept = []
+    for pattern in dict.fromkeys(patterns):
+        clash = next((r for r in required if _overlaps(pattern, r)), None)
+        if clash:
+            print(f"⚠️ Not blocking {pattern}: it overlaps required {clash}")
+            continue
+        kept.append(pattern)
+    return kept
+
+
+def apply_blocking_options(options, profile=RESOURCE_BLOCKING_PROFILE):
+    """Chrome prefs needed before the browser starts."""
+    if profile != "off":
+        options.add_experimental_option(
+            "prefs", {"profile.managed_default_content_settings.images": 2}
+        )
+    return options
+
+
+def _cdp(driver, cmd, params=None):
+    if hasattr(driver, "execute_cdp_cmd"):
+        return driver.execute_cdp_cmd(cmd, params or {})
+    # Remote drivers talk to chromedriver's CDP endpoint through the grid.
+    driver.command_executor._commands["executeCdpCommand"] = (
+        "POST",
+        "/session/$sessionId/goog/cdp/execute",
+    )
+    return driver.execute("executeCdpCommand", {"cmd": cmd, "params": params or {}})["value"]
+
+
+def apply_blocking_to_driver(driver, profile=RESOURCE_BLOCKING_PROFILE):
+    patterns = blocked_patterns(profile)
+    if not patterns:
+        return
+    try:
+        _cdp(driver, "Network.enable")
+        _cdp(driver, "Network.setBlockedURLs", {"urls": patterns})
+        print(f"🚫 Blocking {len(patterns)} resource patterns ({profile})")
+    except Exception as e:
+        print("⚠️ Could not enable resource blocking:", repr(e))
+
+
+def resource_report(driver):
+    """Drain Chrome's performance log into request/byte counts.
+
+    Covers everything since the previous call. Comparing loadedBytes with
+    a RESOURCE_BLOCKING_PROFILE=off run gives the bytes saved.
+    """
+    report = {"loadedRequests": 0, "loadedBytes": 0, "blockedRequests": 0, "blockedByType": {}}
+    if not RESOURCE_REPORT_ENABLED:
+        return report
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return report
+
+    types = {}
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method, params = message.get("method"), message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            types[params.get("requestId")] = params.get("type", "Other")
+        elif method == "Network.loadingFinished":
+            report["loadedRequests"] += 1
+            report["loadedBytes"] += int(params.get("encodedDataLength") or 0)
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            report["blockedRequests"] += 1
+            kind = params.get("type") or types.get(params.get("requestId"), "Other")
+            report["blockedByType"][kind] = report["blockedByType"].get(kind, 0) + 1
+    return report
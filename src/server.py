@@ -1,23 +1,159 @@
-from fastapi import FastAPI
-from src.login import login
-from src.check_order_tracking import check_order_tracking
-from src.place_order import place_order
+import json
+import os
+import queue
+import sys
+import threading
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SRC_DIR, "orderSyncing"))
+sys.path.insert(0, SRC_DIR)
+
+from fastapi import FastAPI, Body, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from accounts import AccountScheduler
+from artifacts import get_artifact_store
+from batch_sync import (
+    TRACKING_SYNC_MODE,
+    check_order_tracking_http,
+    fetch_open_supplier_orders,
+    sync_tracking_batch,
+    sync_tracking_batch_http,
+)
+from check_order_tracking import check_order_tracking
+from checkout_state import get_checkpoint_store
+from concurrency import placement_limiter, tracking_limiter
+from jobs import JOB_WORKERS, JobQueue
+from leases import get_lease_manager
+from metrics import latest_timeline, render_metrics
+from place_order import place_order, prefetch_order_data
 
 app = FastAPI()
+scheduler = AccountScheduler()
+
+
+def run_place_order_job(order_id, progress):
+    with placement_limiter.slot(), scheduler.lease(order_id) as (account, pool):
+        with pool.driver() as driver:
+            return place_order(driver, order_id, progress=progress, account=account["email"])
+
+
+# One worker per account can be checking out at the same time
+jobs = JobQueue(run_place_order_job, workers=max(JOB_WORKERS, scheduler.size))
+
+
+@app.on_event("startup")
+def warm_pool():
+    threading.Thread(target=scheduler.warm, daemon=True).start()
+    jobs.start_recovery()
+
+
+@app.on_event("shutdown")
+def close_pool():
+    jobs.shutdown()
+    scheduler.close()
+    get_artifact_store().close()
+
+
+def job_response(job):
+    return {
+        "jobId": job["id"],
+        "orderId": job["order_id"],
+        "status": job["status"],
+        "steps": job["steps"],
+        "supplierOrderNumber": job["supplier_order_number"],
+        "error": job["error"],
+    }
+
+
+def submit_order(order_id):
+    # Prefetch only for new jobs; a duplicate request just gets the existing one
+    return jobs.submit(
+        order_id,
+        on_create=lambda: threading.Thread(
+            target=prefetch_order_data, args=([order_id],), daemon=True
+        ).start(),
+    )
+
 
 @app.post("/place-order")
 def place_order_api(order_id: str):
-    driver = login()
-    supplier_no = place_order(driver, order_id)
-    driver.quit()
+    job = submit_order(order_id)
+    return {"success": True, **job_response(job)}
+
+
+@app.get("/jobs/{job_id}")
+def job_status_api(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
+
+
+@app.post("/place-orders")
+def place_orders_api(order_ids: list[str] = Body(..., embed=True)):
+    """Queue one job per unique order id; poll /jobs/{jobId} for each."""
+    order_ids = list(dict.fromkeys(str(o) for o in order_ids))
+    return {"success": True, "jobs": [job_response(submit_order(o)) for o in order_ids]}
+
+
+@app.get("/metrics")
+def metrics_api():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/orders/{order_id}/timeline")
+def order_timeline_api(order_id: str):
+    timeline = latest_timeline(order_id)
+    if not timeline:
+        raise HTTPException(status_code=404, detail="No timeline for this order")
+    return timeline
+
 
-    if supplier_no:
-        return {
-            "success": True,
-            "supplierOrderNumber": supplier_no
-        }
+@app.get("/orders/{order_id}/artifacts")
+def order_artifacts_api(order_id: str):
+    return {"orderId": order_id, "artifacts": get_artifact_store().for_order(order_id)}
 
-    return { "success": False }
+
+@app.get("/orders/{order_id}/checkpoint")
+def order_checkpoint_api(order_id: str):
+    store = get_checkpoint_store()
+    return {
+        "orderId": order_id,
+        "state": store.get(order_id),
+        "submission": store.submission(order_id),
+        "placingBy": get_lease_manager().holder(f"order:{order_id}"),
+    }
+
+
+@app.delete("/orders/{order_id}/checkpoint")
+def clear_order_checkpoint_api(order_id: str):
+    """Release the submit guard once the supplier was checked by hand."""
+    get_checkpoint_store().clear(order_id)
+    jobs.release_unknown(order_id)
+    return {"orderId": order_id, "cleared": True}
+
+
+def _check_tracking(account, supplier_order_number):
+    if TRACKING_SYNC_MODE == "http":
+        return check_order_tracking_http(
+            supplier_order_number, account=account["email"], password=account["password"]
+        )
+    with scheduler.pools[account["email"]].driver() as driver:
+        return check_order_tracking(
+            driver=driver,
+            supplier_order_number=supplier_order_number,
+            account=account["email"],
+        )
+
+
+def _sync_tracking(account, numbers):
+    if TRACKING_SYNC_MODE == "http":
+        yield from sync_tracking_batch_http(
+            numbers, account=account["email"], password=account["password"]
+        )
+        return
+    with scheduler.pools[account["email"]].driver() as driver:
+        yield from sync_tracking_batch(driver, numbers, account=account["email"])
 
 
 @app.post("/check-order-tracking")
@@ -26,16 +162,68 @@ def check_order_tracking_api(
     supplier_order_number: str | None = None,
     target_date: str | None = None,
 ):
-    driver = login()
-
-    try:
-        result = check_order_tracking(
-            driver=driver,
-            order_id=order_id,
-            supplier_order_number=supplier_order_number,
-            do_sync=True,
-            target_date=target_date,
-        )
+    # Supplier order numbers only show up in the history of the account
+    # that placed them: ask the one recorded with the order first, then
+    # the others in turn.
+    store = get_checkpoint_store()
+    placed_by = store.account(order_id)
+    if placed_by is None and supplier_order_number:
+        placed_by = store.account_for_supplier_order(supplier_order_number)
+    with tracking_limiter.slot():
+        for account in scheduler.in_order(placed_by):
+            result = _check_tracking(account, supplier_order_number)
+            if result.get("reason") != "Order not found in table":
+                break
         return {"success": True, **result}
-    finally:
-        driver.quit()
+
+
+@app.post("/sync-tracking-batch")
+def sync_tracking_batch_api(
+    supplier_order_numbers: list[str] | None = Body(None, embed=True),
+    all_open: bool = False,
+):
+    numbers = fetch_open_supplier_orders() if all_open else (supplier_order_numbers or [])
+
+    results = queue.Queue()
+
+    def work():
+        # Runs on one thread: the limiter slot keeps per-thread state, and
+        # Starlette would advance a generator from different threads.
+        try:
+            store = get_checkpoint_store()
+            placed_by = {n: store.account_for_supplier_order(n) for n in numbers}
+            not_found = {n: None for n in numbers}
+            with tracking_limiter.slot():
+                # First each order's placing account, then every other
+                # account for the orders still not found.
+                for placing in (True, False):
+                    for account in scheduler.accounts:
+                        email = account["email"]
+                        ask = [n for n in not_found if (placed_by[n] == email) == placing]
+                        if not ask:
+                            continue
+                        for result in _sync_tracking(account, ask):
+                            number = result["supplierOrderNumber"]
+                            if result.get("reason") == "Order not found in table":
+                                not_found[number] = result
+                            else:
+                                not_found.pop(number, None)
+                                results.put(result)
+            for result in not_found.values():
+                results.put(result)
+        except Exception as e:
+            results.put(e)
+        finally:
+            results.put(None)
+
+    def stream():
+        threading.Thread(target=work, daemon=True).start()
+        while True:
+            item = results.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield json.dumps(item) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
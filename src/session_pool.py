@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from cart_http import forget_http_session
+from cookie_store import is_logged_in
+from login import login
+from metrics import stage
+from place_order import _clear_magento_checkout_cache
+from utils import STORE_URL
+from waits import navigate
+
+POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", "2"))
+SESSION_MAX_USES = int(os.getenv("SESSION_MAX_USES", "50"))
+SESSION_MAX_AGE = int(os.getenv("SESSION_MAX_AGE", "3600"))
+# How long a request waits for a session when every one is in use
+SESSION_ACQUIRE_TIMEOUT = float(os.getenv("SESSION_ACQUIRE_TIMEOUT", "300"))
+
+
+def reset_session(driver):
+    """Drop checkout state left by the previous order and park on the homepage.
+
+    The cart itself is cleared by place_order at the start of the next order.
+    """
+    navigate(driver, f"{STORE_URL}/", "homepage")
+    _clear_magento_checkout_cache(driver)
+
+
+class SessionPool:
+    """Keeps up to `size` logged-in drivers warm and hands them out per request."""
+
+    def __init__(self, size=POOL_SIZE, factory=login):
+        self.size = size
+        self.factory = factory
+        # Guards _idle (most recently used last) and _created; notified
+        # whenever a session comes back or a slot frees up.
+        self._cond = threading.Condition()
+        self._idle = []
+        self._created = 0
+        self._closed = False
+
+    def _new_session(self):
+        with stage("login"):
+            driver = self.factory()
+            if not is_logged_in(driver):
+                driver.quit()
+                # A storefront error, so the "login" circuit breaker counts it
+                raise TimeoutError("Login did not produce a logged-in session")
+        return {"driver": driver, "created": time.time(), "uses": 0}
+
+    def _free_slot(self):
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+    def _discard(self, session):
+        self._free_slot()
+        forget_http_session(session["driver"])
+        try:
+            session["driver"].quit()
+        except Exception:
+            pass
+
+    def _expired(self, session):
+        return (
+            session["uses"] >= SESSION_MAX_USES
+            or time.time() - session["created"] > SESSION_MAX_AGE
+        )
+
+    def warm(self):
+        """Log in sessions until the pool is full."""
+        while True:
+            with self._cond:
+                if self._closed or self._created >= self.size:
+                    return
+                self._created += 1
+            try:
+                session = self._new_session()
+            except Exception as e:
+                self._free_slot()
+                print("❌ Session warm-up failed:", repr(e))
+                return
+            with self._cond:
+                self._idle.append(session)
+                self._cond.notify()
+                ready = len(self._idle)
+            print(f"🔥 Warm session ready ({ready}/{self.size})")
+
+    def _take(self, timeout):
+        """An idle session, or None once a slot to create one is reserved."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise Exception("Session pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(
+                        f"No browser session free within {timeout}s ({self.size} in use)"
+                    )
+                self._cond.wait(remaining)
+
+    def acquire(self, timeout=None):
+        while True:
+            session = self._take(timeout)
+            if session is None:
+                try:
+                    session = self._new_session()
+                except Exception:
+                    self._free_slot()
+                    raise
+                session["uses"] += 1
+                return session
+
+            if not self._expired(session) and is_logged_in(session["driver"]):
+                session["uses"] += 1
+                return session
+
+            print("♻️ Session expired or logged out, replacing it")
+            self._discard(session)
+
+    def release(self, session):
+        if self._closed or self._expired(session):
+            self._discard(session)
+            return
+        try:
+            reset_session(session["driver"])
+        except Exception as e:
+            print("⚠️ Session reset failed, discarding:", repr(e))
+            self._discard(session)
+            return
+        with self._cond:
+            self._idle.append(session)
+            self._cond.notify()
+
+    @contextmanager
+    def driver(self, timeout=SESSION_ACQUIRE_TIMEOUT):
+        session = self.acquire(timeout=timeout)
+        try:
+            yield session["driver"]
+        finally:
+            self.release(session)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for session in idle:
+            self._discard(session)
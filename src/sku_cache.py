@@ -0,0 +1,102 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+SKU_CACHE_PATH = os.getenv(
+    "SKU_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sku_cache.sqlite3"),
+)
+SKU_CACHE_TTL = int(os.getenv("SKU_CACHE_TTL", str(7 * 24 * 3600)))
+SKU_CACHE_MEMORY_SIZE = int(os.getenv("SKU_CACHE_MEMORY_SIZE", "2048"))
+
+
+class SkuIndex:
+    """articleNo -> {product, action, url} with TTL, in-memory LRU and sqlite.
+
+    Entries older than `ttl` are reported as misses so the caller resolves
+    them again through the storefront search; `get_stale` still returns
+    them as a last resort.
+    """
+
+    def __init__(self, path=SKU_CACHE_PATH, ttl=SKU_CACHE_TTL, memory_size=SKU_CACHE_MEMORY_SIZE):
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sku_index ("
+            " sku TEXT PRIMARY KEY, entry TEXT NOT NULL, resolved_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def _remember(self, sku, entry, resolved_at):
+        self._memory[sku] = (entry, resolved_at)
+        self._memory.move_to_end(sku)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _lookup(self, sku):
+        if sku in self._memory:
+            self._memory.move_to_end(sku)
+            return self._memory[sku]
+        row = self._db.execute(
+            "SELECT entry, resolved_at FROM sku_index WHERE sku = ?", (sku,)
+        ).fetchone()
+        if row is None:
+            return None
+        found = (json.loads(row[0]), row[1])
+        self._remember(sku, *found)
+        return found
+
+    def get(self, sku):
+        with self._lock:
+            found = self._lookup(sku)
+            if found is None:
+                self.stats["misses"] += 1
+                return None
+            entry, resolved_at = found
+            if time.time() - resolved_at > self.ttl:
+                self.stats["stale"] += 1
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return entry
+
+    def get_stale(self, sku):
+        with self._lock:
+            found = self._lookup(sku)
+        return found[0] if found else None
+
+    def put(self, sku, entry):
+        now = time.time()
+        with self._lock:
+            self._remember(sku, entry, now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO sku_index (sku, entry, resolved_at) VALUES (?, ?, ?)",
+                (sku, json.dumps(entry), now),
+            )
+            self._db.commit()
+
+    def invalidate(self, sku):
+        with self._lock:
+            self._memory.pop(sku, None)
+            self._db.execute("DELETE FROM sku_index WHERE sku = ?", (sku,))
+            self._db.commit()
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_sku_index():
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = SkuIndex()
+    return _default_index
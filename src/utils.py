@@ -7,4 +7,7 @@ def get_env(key):
     value = os.getenv(key)
     if not value:
         raise Exception(f"Missing env variable: {key}")
-    return value
\ No newline at end of file
+    return value
+
+
+STORE_URL = os.getenv("SUPPLIER_STORE_URL", "https://www.cchobby.nl").rstrip("/")
@@ -0,0 +1,179 @@
+import time
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from metrics import observe_wait, timeline_events
+
+# Installs a MutationObserver on first call, then reports whether the page
+# has no visible spinner, no jQuery AJAX in flight and no DOM changes for
+# `quietMs` milliseconds.
+PAGE_IDLE_JS = """
+const quietMs = arguments[0];
+if (!window.__mutationWatch) {
+    window.__lastMutation = Date.now();
+    new MutationObserver(() => { window.__lastMutation = Date.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true});
+    window.__mutationWatch = true;
+    return false;
+}
+if (document.readyState === 'loading') return false;
+const spinner = Array.from(document.querySelectorAll('.loading-mask, .loader'))
+    .some(e => e.offsetParent !== null);
+const ajax = window.jQuery ? window.jQuery.active : 0;
+return !spinner && ajax === 0 && Date.now() - window.__lastMutation >= quietMs;
+"""
+
+QUOTE_JS = """
+try {
+    const quote = require('Magento_Checkout/js/model/quote');
+    return !!(%s);
+} catch(e) { return false; }
+"""
+
+
+# Readiness predicates for every page the flows navigate to. With the
+# "eager"/"none" page-load strategies driver.get() returns before `load`
+# (or before the new document exists at all), so each navigation waits on
+# the DOM it actually needs instead. `__navPending` is set on the old
+# document so a predicate never matches the page we are leaving.
+PAGE_READY_JS = {
+    "document": "return document.readyState !== 'loading' && !!document.body;",
+    "homepage": """
+        const q = document.querySelector("input[name='q']");
+        return !!(q && q.offsetParent !== null && !q.disabled);
+    """,
+    "login": """
+        return !!document.querySelector("#email, #customer-email, form.form-login");
+    """,
+    "search_results": """
+        return !!(document.querySelector('.product-item, .message.notice, .message.info')
+            && document.readyState !== 'loading');
+    """,
+    "cart": """
+        return !!(document.querySelector('#shopping-cart-table, form.form-cart, .cart-empty')
+            && document.readyState !== 'loading');
+    """,
+    "checkout": """
+        try {
+            require('Magento_Checkout/js/model/quote');
+        } catch (e) { return false; }
+        return !!document.querySelector('#checkout-step-shipping, .checkout-shipping-address');
+    """,
+    "history": """
+        return !!(document.querySelector('table tbody tr, .message.info.empty')
+            && document.readyState !== 'loading');
+    """,
+    "order_view": "return !!document.querySelector('.track-order, .order-details-items');",
+}
+
+
+def record_wait(name, seconds, outcome):
+    observe_wait(name, seconds, outcome)
+
+
+def wait_for(driver, name, condition, timeout=30, poll=0.1):
+    """WebDriverWait.until that records how long the wait really took."""
+    start = time.monotonic()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=poll).until(condition)
+    except TimeoutException:
+        record_wait(name, time.monotonic() - start, "timeout")
+        raise
+    except Exception:
+        record_wait(name, time.monotonic() - start, "error")
+        raise
+    record_wait(name, time.monotonic() - start, "ok")
+    return result
+
+
+class TimedWait(WebDriverWait):
+    """Drop-in WebDriverWait whose until() is recorded under `name`."""
+
+    def __init__(self, driver, timeout, name, **kwargs):
+        super().__init__(driver, timeout, **kwargs)
+        self.name = name
+
+    def until(self, method, message=""):
+        start = time.monotonic()
+        try:
+            result = super().until(method, message)
+        except TimeoutException:
+            record_wait(self.name, time.monotonic() - start, "timeout")
+            raise
+        except Exception:
+            record_wait(self.name, time.monotonic() - start, "error")
+            raise
+        record_wait(self.name, time.monotonic() - start, "ok")
+        return result
+
+
+def wait_idle(driver, name="page_idle", timeout=15, quiet_ms=300):
+    """Best-effort wait for spinners, AJAX and DOM mutations to settle."""
+    try:
+        wait_for(
+            driver,
+            name,
+            lambda d: d.execute_script(PAGE_IDLE_JS, quiet_ms),
+            timeout=timeout,
+        )
+    except Exception:
+        pass
+
+
+def wait_quote(driver, name, expression, timeout=30):
+    """Wait for a JS expression over Magento's `quote` model to become truthy."""
+    return wait_for(
+        driver,
+        name,
+        lambda d: d.execute_script(QUOTE_JS % expression),
+        timeout=timeout,
+    )
+
+
+def navigate(driver, url, ready, timeout=30):
+    """driver.get(url), then wait until the PAGE_READY_JS[ready] predicate holds."""
+    try:
+        driver.execute_script("window.__navPending = true;")
+    except Exception:
+        pass
+    driver.get(url)
+    predicate = PAGE_READY_JS[ready]
+    return wait_for(
+        driver,
+        f"{ready}_ready",
+        lambda d: d.execute_script("if (window.__navPending) return false;" + predicate),
+        timeout=timeout,
+    )
+
+
+def wait_stats():
+    """Per-wait count, mean, max and timeout count of the current order.
+
+    Process-wide totals are in the webdriver_wait_seconds histogram.
+    """
+    totals = {}
+    for event in timeline_events("wait"):
+        s = totals.setdefault(event["name"], {"count": 0, "sum": 0.0, "max": 0.0, "timeouts": 0})
+        s["count"] += 1
+        s["sum"] += event["seconds"]
+        s["max"] = max(s["max"], event["seconds"])
+        if event["outcome"] == "timeout":
+            s["timeouts"] += 1
+    return {
+        name: {
+            "count": s["count"],
+            "mean": round(s["sum"] / s["count"], 3),
+            "max": round(s["max"], 3),
+            "timeouts": s["timeouts"],
+        }
+        for name, s in totals.items()
+    }
+
+
+def print_wait_stats():
+    for name, s in sorted(wait_stats().items(), key=lambda kv: -kv[1]["max"]):
+        print(
+            f"⏱️ {name}: n={s['count']} mean={s['mean']}s "
+            f"max={s['max']}s timeouts={s['timeouts']}"
+        )
@@ -0,0 +1,46 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import leases
+from jobs import JobQueue, JobStore
+from leases import LeaseManager, SqliteLeaseBackend
+
+
+def test_job_of_dead_node_is_recovered_once_its_lease_expires(tmp_path, monkeypatch):
+    manager = LeaseManager(SqliteLeaseBackend(str(tmp_path / "leases.sqlite3")), ttl=0.5, heartbeat=0.1)
+    monkeypatch.setattr(leases, "_default_manager", manager)
+
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    # A crashed process: its job is still "running" and its node lease has
+    # not expired yet when the new process starts.
+    dead_node = "oldhost:1:deadbeef"
+    job = store.create("o1", dead_node)
+    store.update(job["id"], status="running")
+    assert manager.backend.acquire(manager._key(f"node:{dead_node}"), "oldhost:1:x", 0.5)
+
+    ran = threading.Event()
+
+    def run(order_id, progress):
+        ran.set()
+        return "S-1"
+
+    queue = JobQueue(run, store=store, workers=1)
+    try:
+        queue.start_recovery(interval=0.1)
+        time.sleep(0.2)
+        assert not ran.is_set()
+        assert store.get(job["id"])["node"] == dead_node
+
+        assert ran.wait(3)
+        deadline = time.monotonic() + 3
+        while store.get(job["id"])["status"] != "succeeded" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        recovered = store.get(job["id"])
+        assert recovered["status"] == "succeeded"
+        assert recovered["node"] == queue.node
+    finally:
+        queue.shutdown()